@@ -1,6 +1,21 @@
 # functions/index.py
+import os
+
+# Serverless defaults, before main reads its settings: no startup maintenance (run
+# `python -m repositories.Maintenance run` after a deploy) and no PDF text extraction
+# on requests (run `python -m services.TextExtraction backfill`); anything that does
+# extract uses a thread, since Lambda has no /dev/shm for worker processes.
+os.environ.setdefault("SERVERLESS", "true")
+os.environ.setdefault("PDF_EXTRACT_WORKERS", "0")
+# Only /tmp is writable on Lambda (512 MB by default): keep resized images there.
+os.environ.setdefault("THUMBNAIL_CACHE_DIR", "/tmp/thumbnail_cache")
+os.environ.setdefault("THUMBNAIL_CACHE_MAX_BYTES", str(128 * 1024 * 1024))
+
 from main import app  # Import the FastAPI app from main.py
 from mangum import Mangum  # Mangum is the adapter to run ASGI apps in AWS Lambda
 
-# Create a Mangum handler for the serverless function
-handler = Mangum(app)
+# Create a Mangum handler for the serverless function. Mangum would run the lifespan
+# around every invocation; with SERVERLESS there is nothing to run, so it is off.
+# The handler and the Mongo client live at module level and are reused while the
+# function stays warm.
+handler = Mangum(app, lifespan="off")
@@ -1,25 +1,62 @@
+import asyncio
 import json
 import os
-import uuid
-from typing import List, Optional, Dict, Any
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, List, Literal, Optional, Dict, Any
 
-import uvicorn
 from bson import ObjectId
 from dotenv import load_dotenv
 from fastapi.encoders import jsonable_encoder
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from pydantic import BaseModel
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBasic, HTTPBasicCredentials, HTTPBearer
+from pydantic import BaseModel, ValidationError
 from starlette.middleware.cors import CORSMiddleware
 import secrets
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Header, Response, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, BackgroundTasks, Depends, HTTPException, Query, Header, Request, Response, UploadFile, File, Form
 from typing import List
-from pymongo import MongoClient
-from fastapi.responses import JSONResponse
-
-from starlette.staticfiles import StaticFiles
-
-app = FastAPI()
-
+from fastapi.responses import StreamingResponse
+from services.ResponseCache import get_response_cache
+from services.ETags import company_etag, etag_matches, list_etag, not_modified
+from services.Passwords import verify_password
+from services.Tokens import InvalidToken, decode_token, issue_token, token_denylist
+from services.BulkImport import bulk_format, records
+from services.Export import EXPORT_FORMATS, csv_lines, ndjson_lines
+from services.Serialization import dump_documents, dump_validated
+from services.Attachments import attach_uploads
+from services.BlobStore import BlobStore
+from services.Storage import get_storage
+from services.TextExtraction import TextExtractor, is_pdf
+from services.Thumbnails import THUMBNAIL_MAX_DIMENSION, ThumbnailCache
+from services.Uploads import (MAX_UPLOAD_SIZE, MULTIPART_OVERHEAD, UploadSizeLimit, build_file_url, save_upload,
+                              save_uploads)
+
+from repositories.AttachmentSearch import AttachmentSearch
+from repositories.CompanyRepository import WRITE_BATCH_SIZE, CompanyRepository
+from repositories.CompanySections import SECTION_FIELDS, InvalidOperation, SectionConflict
+from repositories.CompanySearch import SEARCH_FIELDS, search_query
+from repositories.Database import get_database
+from repositories.Indexes import index_report
+from repositories.Maintenance import run_maintenance
+from repositories.UserRepository import UserRepository
+from models.UserModel import LoginRequest, TokenResponse
+from repositories.Pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_query, parse_sort, sort_spec
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serverless: nothing at startup, so a cold start never waits on (or even connects to) Mongo
+    # for upkeep; run `python -m repositories.Maintenance run` after deploying instead.
+    if not SERVERLESS:
+        await run_maintenance(db, COMPANY_SEARCH_MODE)
+    yield
+    text_extractor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Added before CORS so that its 413s still carry the CORS headers.
+app.add_middleware(UploadSizeLimit, path_limits={"/admin/upload/": MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD})
 app.add_middleware(
     CORSMiddleware,
     #allow_origins=["*"],
@@ -27,33 +64,98 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["x-total-count", "x-has-more", "x-next-cursor", "etag"],
 )
 
 load_dotenv()
 
 BASE_URL = os.getenv("API_BASE_URL")
+# Set by functions/index.py (Netlify/Lambda through Mangum).
+SERVERLESS = os.getenv("SERVERLESS", "false").lower() in ("1", "true", "yes")
 
 MONGODB_URL = os.getenv("MONGODB_URL")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
-
-client = MongoClient(MONGODB_URL)
-db = client[DATABASE_NAME]
+COMPANY_COUNT_STRATEGY = os.getenv("COMPANY_COUNT_STRATEGY", "exact")
+COMPANY_COUNT_CACHE_TTL = float(os.getenv("COMPANY_COUNT_CACHE_TTL", "30"))
+# "index" searches the indexed searchKeys with relevance ranking; "regex" is the old name substring match.
+COMPANY_SEARCH_MODE = os.getenv("COMPANY_SEARCH_MODE", "index")
+# Matches ranked per search; any beyond that follow the ranked ones in _id order.
+COMPANY_SEARCH_MAX_CANDIDATES = int(os.getenv("COMPANY_SEARCH_MAX_CANDIDATES", "2000"))
+COMPANY_EXPORT_BATCH_SIZE = int(os.getenv("COMPANY_EXPORT_BATCH_SIZE", "500"))
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "500"))
+ATTACHMENT_SEARCH_MAX_CANDIDATES = int(os.getenv("ATTACHMENT_SEARCH_MAX_CANDIDATES", "200"))
+# Validate every company against its response model before encoding (debugging aid, slower).
+STRICT_RESPONSE_VALIDATION = os.getenv("STRICT_RESPONSE_VALIDATION", "false").lower() in ("1", "true", "yes")
+
+db = get_database(MONGODB_URL, DATABASE_NAME)
 companies_collection = db["companies"]
+storage = get_storage()
+blob_store = BlobStore(db["blobs"], storage)
+thumbnails = ThumbnailCache(storage)
+# PDF text is extracted after the response is sent, in a process pool (see extract_attachments).
+text_extractor = TextExtractor(db, storage)
+attachment_search = AttachmentSearch(
+    db["attachment_pages"], db["company_texts"], companies_collection, ATTACHMENT_SEARCH_MAX_CANDIDATES
+)
+response_cache = get_response_cache()
+users_collection = db["users"]
+user_repository = UserRepository(users_collection)
+company_repository = CompanyRepository(
+    companies_collection, COMPANY_COUNT_STRATEGY, COMPANY_COUNT_CACHE_TTL, COMPANY_SEARCH_MAX_CANDIDATES
+)
 
-# Authentication (Basic HTTP Auth)
-security = HTTPBasic()
-ADMIN_USERNAME = "admin"
-ADMIN_PASSWORD = "password"
-
-app.mount("/files", StaticFiles(directory="uploads"))
+# Authentication: Bearer tokens from /admin/login, with HTTP Basic as a fallback
+security = HTTPBasic(auto_error=False)
+bearer = HTTPBearer(auto_error=False)
+# Legacy built-in account, used only when no user of that name exists in the users collection.
+# Opt-in: off unless both are set (e.g. to create the first user on a fresh database).
+ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
+
+
+async def check_credentials(username: str, password: str) -> Optional[Dict[str, Any]]:
+    """Returns the user for a username/password pair, or None. bcrypt runs in the password pool."""
+    user = await user_repository.get_by_username(username)
+    if user:
+        return user if await verify_password(password, user["password"]) else None
+    if not (ADMIN_USERNAME and ADMIN_PASSWORD):
+        return None
+    correct_username = secrets.compare_digest(username.encode(), ADMIN_USERNAME.encode())
+    correct_password = secrets.compare_digest(password.encode(), ADMIN_PASSWORD.encode())
+    if correct_username and correct_password:
+        return {"_id": None, "username": ADMIN_USERNAME, "role": "admin"}
+    return None
+
+
+def token_claims(token: HTTPAuthorizationCredentials) -> Dict[str, Any]:
+    try:
+        claims = decode_token(token.credentials)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    if token_denylist.is_revoked(claims.get("jti")):
+        raise HTTPException(status_code=401, detail="Token has been revoked", headers={"WWW-Authenticate": "Bearer"})
+    return claims
 
 
-def authenticate_admin(credentials: HTTPBasicCredentials = Depends(security)):
-    correct_username = secrets.compare_digest(credentials.username, ADMIN_USERNAME)
-    correct_password = secrets.compare_digest(credentials.password, ADMIN_PASSWORD)
-    if not (correct_username and correct_password):
-        raise HTTPException(status_code=401, detail="Incorrect username or password")
-    return credentials.username
+async def authenticate_admin(
+    token: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+    credentials: Optional[HTTPBasicCredentials] = Depends(security),
+):
+    """Accepts a Bearer token (checked locally, no DB or bcrypt) or Basic credentials; requires the admin role."""
+    if token:
+        claims = token_claims(token)
+        username, role = claims["username"], claims["role"]
+    elif credentials:
+        user = await check_credentials(credentials.username, credentials.password)
+        if user is None:
+            raise HTTPException(status_code=401, detail="Incorrect username or password",
+                                headers={"WWW-Authenticate": "Basic"})
+        username, role = user["username"], user.get("role")
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Basic"})
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return username
 
 
 # Pydantic Models
@@ -140,6 +242,111 @@ class CompanyResponse(BaseModel):
     assessment: List[KeyValuePair]
     portfolio: List[KeyValuePair]
     dynamicSections: List[DynamicSection]
+    version: Optional[int] = None
+    updatedAt: Optional[datetime] = None
+
+class CompanyChanges(BaseModel):
+    name: Optional[str] = None
+    category: Optional[str] = None
+    size: Optional[str] = None
+    location: Optional[str] = None
+    description: Optional[str] = None
+    logo: Optional[str] = None
+    website: Optional[str] = None
+    revenue: Optional[int] = None
+    founded: Optional[str] = None
+    headquarters: Optional[str] = None
+    mission: Optional[str] = None
+    company_values: Optional[List[str]] = None
+    investors: Optional[List[KeyValuePair]] = None
+    financialStatement: Optional[List[KeyValuePair]] = None
+    assessment: Optional[List[KeyValuePair]] = None
+    portfolio: Optional[List[KeyValuePair]] = None
+    dynamicSections: Optional[List[DynamicSection]] = None
+
+class CompanySelection(BaseModel):
+    """Companies to act on: explicit ids and/or the list_companies filters (all given must match)."""
+    ids: Optional[List[str]] = None
+    search: Optional[str] = None
+    category: Optional[str] = None
+    size: Optional[str] = None
+    location: Optional[str] = None
+    dry_run: bool = False
+
+class CompanyBulkUpdate(CompanySelection):
+    set: CompanyChanges
+
+class SectionOperation(BaseModel):
+    """add an item (at position), replace/remove one by key or index, or reorder by the full list of keys."""
+    op: Literal["add", "replace", "remove", "reorder"]
+    key: Optional[str] = None
+    index: Optional[int] = None
+    item: Optional[Dict[str, Any]] = None
+    position: Optional[int] = None
+    keys: Optional[List[str]] = None
+
+class SectionPatch(BaseModel):
+    operations: List[SectionOperation]
+    version: Optional[int] = None  # fail with 409 unless the company is still at this version
+
+class CompanySummaryResponse(BaseModel):
+    id: str
+    name: str
+    category: str
+    size: str
+    location: str
+    logo: str
+    website: str
+    revenue: int
+
+
+def extract_attachments(background_tasks: BackgroundTasks, task, *args) -> None:
+    """Queues PDF text extraction to run after the response is sent.
+
+    Skipped with SERVERLESS: Mangum waits for background tasks before it
+    returns, so the request would wait for the extraction. There, run
+    `python -m services.TextExtraction backfill` after deploys or on a schedule.
+    """
+    if not SERVERLESS:
+        background_tasks.add_task(task, *args)
+
+
+def build_company_query(search: Optional[str], category: Optional[str], size: Optional[str], location: Optional[str]):
+    """Mongo filter for the company list filters, shared by every endpoint that selects companies."""
+    query = {}
+    if search and COMPANY_SEARCH_MODE == "index":
+        query.update(search_query(search))
+    elif search:
+        query["name"] = {"$regex": re.escape(search), "$options": "i"}
+    if category:
+        query["category"] = category
+    if size:
+        query["size"] = size
+    if location:
+        query["location"] = location
+    return query
+
+
+def company_projection(fields: Optional[str], view: Optional[str]):
+    """Returns (selected field names or None, Mongo projection) for fields=/view= parameters.
+
+    Only the columns the caller asked for are loaded; nested sections stay in Mongo.
+    """
+    if fields:
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected_fields if field not in CompanyResponse.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return selected_fields, {field: 1 for field in selected_fields if field != "id"} or {"_id": 1}
+    if view == "summary":
+        return None, {field: 1 for field in CompanySummaryResponse.model_fields if field != "id"}
+    if view in (None, "full"):
+        return None, {field: 1 for field in CompanyResponse.model_fields if field != "id"}
+    raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+
+
+# Company fields that can hold uploaded file URLs.
+FILE_REFERENCE_FIELDS = ["logo", "investors", "financialStatement", "assessment", "portfolio", "dynamicSections"]
 
 
 # Admin Endpoints
@@ -147,8 +354,27 @@ class CompanyResponse(BaseModel):
 async def root():
     return {"message": "Welcome to the API"}
 
+@app.post("/admin/login", response_model=TokenResponse)
+async def login(login_request: LoginRequest):
+    """Checks the password once and returns a signed token to send as ``Authorization: Bearer``."""
+    user = await check_credentials(login_request.username, login_request.password)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    issued = issue_token(str(user["_id"]) if user["_id"] else user["username"], user["username"], user.get("role") or "user")
+    claims = issued["claims"]
+    return TokenResponse(access_token=issued["token"], expires_in=claims["exp"] - claims["iat"], role=claims["role"])
+
+@app.post("/admin/logout", response_model=dict)
+async def logout(token: Optional[HTTPAuthorizationCredentials] = Depends(bearer)):
+    """Revokes the presented token until it would have expired anyway."""
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    token_denylist.revoke(token_claims(token))
+    return {"message": "Logged out"}
+
 @app.post("/admin/companies/add", response_model=dict)
 async def create_company(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     category: str = Form(...),
     size: str = Form(...),
@@ -196,70 +422,199 @@ async def create_company(
             "dynamicSections": dynamicSections_list
         }
 
-        UPLOAD_DIR = "uploads"
-        ALLOWED_FILE_TYPES = ["image/jpeg", "image/png", "application/pdf"]
-        if not os.path.exists(UPLOAD_DIR):
-            os.makedirs(UPLOAD_DIR)
-
-        BASE_URL = os.getenv("API_BASE_URL")
-
+        request_files = [file for file in request_files if file]
+        stored_files = await save_uploads(([logo] if logo else []) + request_files, blob_store)
         if logo:
-            if logo.content_type not in ALLOWED_FILE_TYPES:
-                raise HTTPException(status_code=400, detail="Invalid logo file type")
-            file_id = str(uuid.uuid4())
-            file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{logo.filename}")
-            with open(file_path, "wb") as buffer:
-                buffer.write(await logo.read())
-
-            if BASE_URL:
-                file_url = f"{BASE_URL}/files/{file_id}_{logo.filename}"
-            else:
-                file_url = f"/files/{file_id}_{logo.filename}"
-
-            company_data["logo"] = file_url
+            company_data["logo"] = stored_files.pop(0).file_url
         else:
             company_data["logo"] = f"/files/no-logo.png"
 
-        for file in request_files:
-            if file:
-                if file.content_type not in ALLOWED_FILE_TYPES:
-                    raise HTTPException(status_code=400, detail=f"Invalid file type for {file.filename}")
-                file_id = str(uuid.uuid4())
-                file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{file.filename}")
-                with open(file_path, "wb") as buffer:
-                    buffer.write(await file.read())
-
-                if BASE_URL:
-                    file_url = f"{BASE_URL}/files/{file_id}_{file.filename}"
-                else:
-                    file_url = f"/files/{file_id}_{file.filename}"
-
-                for list_name in ["investors", "financialStatement", "assessment", "portfolio"]:
-                    list_data = company_data[list_name]
-                    if isinstance(list_data, list):
-                        for item in list_data:
-                            if isinstance(item, dict) and "key" in item and "value" in item and "fileName" in item:
-                                if file.filename == item["fileName"]:
-                                    item["fileName"] = file_url
-
-                if isinstance(company_data["dynamicSections"], list):
-                    for section in company_data["dynamicSections"]:
-                        if isinstance(section, dict) and isinstance(section.get("value"), list):
-                            for item in section["value"]:
-                                if isinstance(item, dict) and "fileName" in item:
-                                    if file.filename == item["fileName"]:
-                                        item["fileName"] = file_url
-
-        result = companies_collection.insert_one(company_data)
-        return {"id": str(result.inserted_id)}
+        attachments = attach_uploads(
+            company_data, [(file.filename, stored_file.file_url) for file, stored_file in zip(request_files, stored_files)]
+        )
+        if attachments["unmatched_files"] or attachments["unmatched_references"]:
+            print(f"Unmatched attachments in create_company: {attachments}")
+
+        company_id = await company_repository.insert(company_data)
+        await blob_store.retain(company_data)
+        await response_cache.invalidate()
+        extract_attachments(background_tasks, text_extractor.index_company, ObjectId(company_id))
+        return {"id": company_id, **attachments}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in create_company: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc']) or 'record'}: {e['msg']}" for e in error.errors())
+
+@app.post("/admin/companies/bulk", response_model=dict)
+async def bulk_create_companies(request: Request, background_tasks: BackgroundTasks, admin: str = Depends(authenticate_admin)):
+    """Creates companies from an NDJSON or JSON-array body of CompanyCreate records.
+
+    The body is parsed as it streams in and written in unordered insert_many
+    batches; the next batch is parsed while the previous one is being written.
+    Returns one result per record, in input order: its new id or why it failed.
+    If the stream itself fails part way (bad encoding, a failed write), the
+    response is a 400/500 with the same per-row results plus an ``error``.
+    """
+    body_format = bulk_format(request.headers.get("content-type"))
+    if body_format is None:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or a application/json array")
+
+    results = []
+    inserted = []
+
+    async def insert_batch(batch):
+        errors = await company_repository.insert_many([document for _, document in batch])
+        for position, (index, document) in enumerate(batch):
+            if position in errors:
+                results.append({"index": index, "error": errors[position]})
+            else:
+                results.append({"index": index, "id": str(document["_id"])})
+                inserted.append(document)
+
+    batch = []
+    pending = None
+    index = 0
+    stream_error = None
+    try:
+        async for record, error in records(request.stream(), body_format):
+            if error is None:
+                try:
+                    document = CompanyCreate.model_validate(record).model_dump()
+                    document["logo"] = document["logo"] or "/files/no-logo.png"
+                    batch.append((index, document))
+                except ValidationError as e:
+                    error = validation_message(e)
+            if error is not None:
+                results.append({"index": index, "error": error})
+            index += 1
+            if len(batch) >= BULK_INSERT_BATCH_SIZE:
+                if pending:
+                    await pending
+                pending, batch = asyncio.create_task(insert_batch(batch)), []
+        if pending:
+            await pending
+        if batch:
+            await insert_batch(batch)
+    except UnicodeDecodeError:
+        stream_error = (400, "Body must be UTF-8 encoded")
+    except Exception as e:
+        print(f"Error in bulk_create_companies: {e}")
+        stream_error = (500, f"Import stopped: {e}")
+    finally:
+        if pending and not pending.done():
+            await asyncio.wait([pending])
+        if inserted:
+            await blob_store.retain(inserted)
+            await response_cache.invalidate()
+            inserted_ids = [document["_id"] for document in inserted]
+            extract_attachments(background_tasks, text_extractor.index_companies, inserted_ids)
+
+    if stream_error:
+        # Earlier batches are already written: say which rows made it, and mark the
+        # rows read but not confirmed (unsent or in a failed batch) as such.
+        reported = {result["index"] for result in results}
+        results += [{"index": position, "error": "Not imported: the import stopped before this row was written"}
+                    for position in range(index) if position not in reported]
+    results.sort(key=lambda result: result["index"])
+    body = {"inserted": len(inserted), "failed": len(results) - len(inserted), "results": results}
+    if stream_error:
+        status_code, body["error"] = stream_error
+        return Response(content=dump_documents(body), status_code=status_code, media_type="application/json")
+    return body
+
+def selection_query(selection: CompanySelection) -> Dict[str, Any]:
+    query = build_company_query(selection.search, selection.category, selection.size, selection.location)
+    if selection.ids is not None:
+        try:
+            query["_id"] = {"$in": [ObjectId(company_id) for company_id in selection.ids]}
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid company ID format")
+    if not query:
+        raise HTTPException(status_code=400, detail="Select companies by ids or by at least one filter")
+    return query
+
+async def selected_batches(query: Dict[str, Any], fields: List[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Selected companies in _id order, WRITE_BATCH_SIZE at a time, with only ``fields`` loaded."""
+    projection = {field: 1 for field in fields} or {"_id": 1}
+    batch = []
+    async for company in company_repository.iterate(query, projection, WRITE_BATCH_SIZE):
+        batch.append(company)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+@app.post("/admin/companies/bulk/update", response_model=dict)
+async def bulk_update_companies(
+    bulk_update: CompanyBulkUpdate, background_tasks: BackgroundTasks, admin: str = Depends(authenticate_admin)
+):
+    """Sets the same fields on every selected company; dry_run only reports how many match."""
+    try:
+        company_data = jsonable_encoder(bulk_update.set.model_dump(exclude_unset=True))
+        if not company_data:
+            raise HTTPException(status_code=400, detail="No update data provided")
+        # Read only what the write needs: search fields to rebuild searchKeys, file fields to move references.
+        fields = [field for field in FILE_REFERENCE_FIELDS if field in company_data]
+        if any(field in company_data for field in SEARCH_FIELDS):
+            fields += SEARCH_FIELDS
+        query = selection_query(bulk_update)
+        if bulk_update.dry_run:
+            return {"matched": await companies_collection.count_documents(query), "modified": 0, "dry_run": True}
+
+        matched = modified = 0
+        moves_files = any(field in company_data for field in FILE_REFERENCE_FIELDS)
+        updated_ids = []
+        async for companies in selected_batches(query, fields):
+            matched += len(companies)
+            modified += await company_repository.update_many(companies, company_data)
+            if moves_files:
+                await blob_store.update_references(companies, [{**company, **company_data} for company in companies])
+                updated_ids += [company["_id"] for company in companies]
+            await response_cache.invalidate(*(str(company["_id"]) for company in companies))
+        if updated_ids:
+            extract_attachments(background_tasks, text_extractor.index_companies, updated_ids)
+        return {"matched": matched, "modified": modified, "dry_run": False}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in bulk_update_companies: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+@app.post("/admin/companies/bulk/delete", response_model=dict)
+async def bulk_delete_companies(
+    selection: CompanySelection, background_tasks: BackgroundTasks, admin: str = Depends(authenticate_admin)
+):
+    """Deletes every selected company and releases its files; dry_run only reports how many match."""
+    try:
+        query = selection_query(selection)
+        if selection.dry_run:
+            return {"matched": await companies_collection.count_documents(query), "deleted": 0, "dry_run": True}
+
+        matched = deleted = 0
+        async for companies in selected_batches(query, FILE_REFERENCE_FIELDS):
+            matched += len(companies)
+            deleted += await company_repository.delete_many([company["_id"] for company in companies])
+            await blob_store.release(companies)
+            await response_cache.invalidate(*(str(company["_id"]) for company in companies))
+            for company in companies:
+                background_tasks.add_task(text_extractor.remove_company, company["_id"])
+        return {"matched": matched, "deleted": deleted, "dry_run": False}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in bulk_delete_companies: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
 @app.put("/admin/companies/{company_id}", response_model=dict)
 async def update_company(
     company_id: str,
+    background_tasks: BackgroundTasks,
     name: Optional[str] = None,
     category: Optional[str] = None,
     size: Optional[str] = None,
@@ -279,8 +634,6 @@ async def update_company(
     dynamicSections: Optional[List[DynamicSection]] = None,
     admin: str = Depends(authenticate_admin)
 ):
-    ALLOWED_FILE_TYPES = ["image/jpeg", "image/png", "application/pdf"]
-    UPLOAD_DIR = "uploads"
     try:
         try:
             object_id = ObjectId(company_id)
@@ -306,45 +659,93 @@ async def update_company(
         if dynamicSections is not None: company_data["dynamicSections"] = dynamicSections
 
         if logo:
-            if not os.path.exists(UPLOAD_DIR):
-                os.makedirs(UPLOAD_DIR)
-
-            if logo.content_type not in ALLOWED_FILE_TYPES:
-                raise HTTPException(status_code=400, detail="Invalid file type")
-
             try:
-                file_id = str(uuid.uuid4())
-                file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{logo.filename}")
-
-                with open(file_path, "wb") as buffer:
-                    buffer.write(await logo.read())
-
-                BASE_URL = os.getenv("API_BASE_URL")
-                file_url = f"{BASE_URL}/files/{file_id}_{logo.filename}"
-
-                company_data["logo"] = file_url
-
+                stored_logo = await save_upload(logo, blob_store)
+                company_data["logo"] = stored_logo.file_url
             except OSError as e:
                 raise HTTPException(status_code=500, detail=f"Error saving file: {e}")
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
 
         if company_data:
-            result = companies_collection.update_one({"_id": object_id}, {"$set": company_data})
+            before = None
+            if any(field in company_data for field in FILE_REFERENCE_FIELDS):
+                before = await company_repository.get(object_id)
+            result = await company_repository.update(object_id, company_data)
             if result.modified_count > 0:
+                if before:
+                    await blob_store.update_references(before, {**before, **company_data})
+                    extract_attachments(background_tasks, text_extractor.index_company, object_id)
+                await response_cache.invalidate(str(object_id))
                 return {"message": "Company updated successfully"}
             else:
                 raise HTTPException(status_code=404, detail="Company not found")
         else:
             raise HTTPException(status_code=400, detail="No update data provided")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in update_company: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
+@app.patch("/admin/companies/{company_id}/sections/{section}", response_model=dict)
+async def patch_company_section(
+    company_id: str,
+    section: str,
+    patch: SectionPatch,
+    background_tasks: BackgroundTasks,
+    admin: str = Depends(authenticate_admin),
+):
+    """Edits single items of a section ($push/$pull/positional $set) instead of rewriting the whole array.
+
+    All operations apply together or not at all: a batch of several is written as one update.
+    """
+    try:
+        object_id = ObjectId(company_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid company ID format")
+    if section not in SECTION_FIELDS:
+        raise HTTPException(status_code=404, detail=f"Unknown section: {section}")
+
+    item_model = DynamicSection if section == "dynamicSections" else KeyValuePair
+    operations = []
+    for operation in patch.operations:
+        operation = operation.model_dump(exclude_none=True)
+        if operation["op"] in ("add", "replace"):
+            if "item" not in operation:
+                raise HTTPException(status_code=422, detail=f"'{operation['op']}' needs an item")
+            try:
+                # Checked against the model but stored as sent, like create_company, so fileName survives.
+                item_model.model_validate(operation["item"])
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=validation_message(e))
+        operations.append(operation)
+
+    try:
+        result = await company_repository.patch_section(object_id, section, operations, patch.version)
+    except InvalidOperation as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SectionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Company not found")
+    before, after, version = result
+    if section in FILE_REFERENCE_FIELDS:
+        await blob_store.update_references(before, after)
+        extract_attachments(background_tasks, text_extractor.index_company, object_id)
+    await response_cache.invalidate(str(object_id))
+    return {"message": "Section updated successfully", "version": version, "items": len(after)}
+
 @app.delete("/admin/companies/{company_id}", response_model=dict)
-async def delete_company(company_id: str, admin: str = Depends(authenticate_admin)):
-    result = companies_collection.delete_one({"id": company_id})
+async def delete_company(company_id: str, background_tasks: BackgroundTasks, admin: str = Depends(authenticate_admin)):
+    try:
+        object_id = ObjectId(company_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid company ID format")
+    company = await company_repository.get(object_id)
+    result = await company_repository.delete(object_id)
     if result.deleted_count > 0:
+        await blob_store.release(company)
+        await response_cache.invalidate(str(object_id))
+        background_tasks.add_task(text_extractor.remove_company, object_id)
         return {"message": "Company deleted successfully"}
     else:
         raise HTTPException(status_code=404, detail="Company not found")
@@ -359,61 +760,224 @@ async def list_companies(
     location: str = Query(None),
     limit: int = Query(100),
     skip: int = Query(0),
+    cursor: Optional[str] = Query(None, description="Opt-in keyset pagination; pass an empty value for the first page"),
+    sort: Optional[str] = Query(None, description="_id, name, -_id or -name"),
+    fields: Optional[str] = Query(None, description="Comma-separated CompanyResponse fields to return"),
+    view: Optional[str] = Query(None, description="full (default) or summary"),
+    if_none_match: Optional[str] = Header(None),
 ):
     try:
-        query = {}
-        if search:
-            query["name"] = {"$regex": search, "$options": "i"}
-        if category:
-            query["category"] = category
-        if size:
-            query["size"] = size
-        if location:
-            query["location"] = location
-
-        total_count = companies_collection.count_documents(query)
-
-        companies_data = list(companies_collection.find(query).skip(skip).limit(limit))
+        params = {"search": search, "category": category, "size": size, "location": location, "limit": limit,
+                  "skip": skip, "cursor": cursor, "sort": sort, "fields": fields, "view": view}
+        generation = await response_cache.list_generation()
+        cached = await response_cache.get_list(generation, params)
+        if cached:
+            body, headers = cached
+            if etag_matches(if_none_match, headers["ETag"]):
+                return not_modified(headers["ETag"])
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        selected_fields, projection = company_projection(fields, view)
+        query = build_company_query(search, category, size, location)
 
+        try:
+            sort_field, sort_direction = parse_sort(sort)
+            page_sort = sort_spec(sort_field, sort_direction) if sort or cursor is not None else None
+            page_query = query
+            if cursor is not None:
+                # Keyset mode: seek past the last row of the previous page instead of skipping.
+                skip = 0
+            if cursor:
+                page_query = keyset_query(query, sort_field, sort_direction,
+                                          decode_cursor(cursor, sort_field, sort_direction))
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if projection and page_sort:
+            projection[sort_field] = 1
+        if projection:
+            projection["version"] = 1
+
+        # One extra row tells us whether another page exists without a count.
+        fetch_limit = limit + 1 if limit else 0
+        if search and COMPANY_SEARCH_MODE == "index" and page_sort is None:
+            find_page = company_repository.search_page(query, search, skip, fetch_limit, projection)
+        else:
+            find_page = company_repository.find_page(page_query, skip, fetch_limit, page_sort, projection)
+        total_count, companies_data = await asyncio.gather(company_repository.count(query), find_page)
+        has_more = bool(limit) and len(companies_data) > limit
+        if has_more:
+            companies_data = companies_data[:limit]
+        next_cursor = None
+        if cursor is not None and has_more:
+            next_cursor = encode_cursor(sort_field, sort_direction, companies_data[-1])
+
+        # Documents from Mongo are trusted: encode them directly unless strict validation is on.
         companies = []
+        rows = []
         for company_data in companies_data:
-            company_data["id"] = str(company_data.pop("_id"))
-            companies.append(CompanyResponse(**company_data))
+            company_id = str(company_data.pop("_id"))
+            rows.append((company_id, company_data.get("version")))
+            if view == "summary":
+                company_data.pop("version", None)
+            if selected_fields:
+                companies.append({field: company_id if field == "id" else company_data.get(field)
+                                  for field in ["id"] + selected_fields})
+            else:
+                companies.append({"id": company_id, **company_data})
 
-        json_compatible_item_data = jsonable_encoder(companies)
+        headers = {"x-has-more": "true" if has_more else "false"}
+        if total_count is not None:
+            headers["x-total-count"] = str(total_count)
+        if next_cursor:
+            headers["x-next-cursor"] = next_cursor
 
-        headers = {"x-total-count": str(total_count)}
+        headers["ETag"] = list_etag(params, rows, headers)
+        if etag_matches(if_none_match, headers["ETag"]):
+            return not_modified(headers["ETag"])
 
-        return JSONResponse(content=json_compatible_item_data, headers=headers)
+        if STRICT_RESPONSE_VALIDATION and not selected_fields:
+            body = dump_validated(CompanySummaryResponse if view == "summary" else CompanyResponse, companies)
+        else:
+            body = dump_documents(companies)
 
+        await response_cache.set_list(generation, params, body, headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+@app.get("/admin/companies/export")
+async def export_companies(
+    admin: str = Depends(authenticate_admin),
+    format: str = Query("ndjson", description="ndjson or csv"),
+    search: str = Query(None),
+    category: str = Query(None),
+    size: str = Query(None),
+    location: str = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated CompanyResponse fields to export"),
+    view: Optional[str] = Query(None, description="full (default) or summary"),
+):
+    """Streams every company matching the list filters from a Mongo cursor, in constant memory."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    selected_fields, projection = company_projection(fields, view)
+    query = build_company_query(search, category, size, location)
+    documents = company_repository.iterate(query, projection, COMPANY_EXPORT_BATCH_SIZE)
+
+    if format == "csv":
+        columns = selected_fields or ["id"] + [field for field in projection if field != "_id"]
+        content = csv_lines(documents, columns)
+    else:
+        content = ndjson_lines(documents)
+    headers = {"Content-Disposition": f'attachment; filename="companies.{format}"'}
+    return StreamingResponse(content, media_type=EXPORT_FORMATS[format], headers=headers)
 
 @app.get("/admin/companies/{company_id}")
-async def get_company(company_id: str, admin: bool = Depends(authenticate_admin)):
+async def get_company(
+    company_id: str,
+    admin: bool = Depends(authenticate_admin),
+    if_none_match: Optional[str] = Header(None),
+):
     try:
-        company = companies_collection.find_one({"_id": ObjectId(company_id)})
-        if company:
+        object_id = ObjectId(company_id)
+        generation = await response_cache.company_generation(str(object_id))
+        cached = await response_cache.get_company(generation, str(object_id))
+        if cached is None:
+            if if_none_match:
+                # Revalidation only needs the version, not the document.
+                version = await company_repository.get_version(object_id)
+                if version is not None and etag_matches(if_none_match, company_etag(str(object_id), version)):
+                    return not_modified(company_etag(str(object_id), version))
+            company = await company_repository.get(object_id)
+            if not company:
+                raise HTTPException(status_code=404, detail="Company not found")
             company["_id"] = str(company["_id"])
-            return company
-        else:
-            raise HTTPException(status_code=404, detail="Company not found")
+            cached = dump_documents(company), {"ETag": company_etag(company["_id"], company.get("version"))}
+            await response_cache.set_company(generation, str(object_id), *cached)
+        body, headers = cached
+        if etag_matches(if_none_match, headers["ETag"]):
+            return not_modified(headers["ETag"])
+        return Response(content=body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error getting company: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/admin/attachments/search", response_model=dict)
+async def search_attachments(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    hits: int = Query(3, ge=1, le=20),
+    skip: int = Query(0, ge=0),
+    admin: str = Depends(authenticate_admin),
+):
+    """Companies whose PDF attachments contain every word of q, with the best matching pages and snippets.
+
+    Companies with the most matching pages come first; ``total`` counts them all
+    and ``skip`` pages through them.
+    """
+    try:
+        result = await attachment_search.search(q, limit, hits, skip)
+        if result is None:
+            raise HTTPException(status_code=400, detail="Search needs at least one word")
+        for company in result["companies"]:
+            for hit in company["hits"]:
+                hit["file_url"] = build_file_url(hit.pop("stored_name"))
+        return {"query": q, **result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in search_attachments: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+@app.get("/admin/indexes")
+async def get_index_stats(admin: str = Depends(authenticate_admin)):
+    """Index usage counters and which recorded company queries run as collection scans."""
+    try:
+        return {
+            "companies": await index_report(companies_collection, company_repository.query_shapes),
+            "users": await index_report(db["users"]),
+            "attachment_pages": await index_report(db["attachment_pages"]),
+        }
+    except Exception as e:
+        print(f"Error reading index stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+@app.get("/admin/cache")
+async def get_cache_stats(admin: str = Depends(authenticate_admin)):
+    """Hit/miss counters of the company response cache."""
+    return response_cache.stats()
+
 @app.post("/admin/upload/")
-async def upload_file(file: UploadFile = File(...)):
-    BASE_URL = os.getenv("API_BASE_URL")
-    file_id = str(uuid.uuid4())
-    file_path = f"uploads/{file_id}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    stored_file = await save_upload(file, blob_store, allowed_types=None)
+    if is_pdf(stored_file.stored_name, stored_file.file_type):
+        extract_attachments(background_tasks, text_extractor.extract_upload,
+                            stored_file.stored_name, stored_file.sha256)
+    return {"filename": file.filename, "file_url": stored_file.file_url, "file_type": file.content_type}
+
+@app.api_route("/files/{name:path}", methods=["GET", "HEAD"])
+async def get_file(
+    request: Request,
+    name: str,
+    w: Optional[int] = Query(None, ge=1, le=THUMBNAIL_MAX_DIMENSION),
+    h: Optional[int] = Query(None, ge=1, le=THUMBNAIL_MAX_DIMENSION),
+    format: Optional[str] = Query(None),
+):
+    """Serves an upload from local disk, or redirects to the object store (direct or presigned URL).
 
-    file_url = f"{BASE_URL}/files/{file_id}_{file.filename}"
+    Local files are sent with a long-lived immutable Cache-Control (names carry
+    the content hash), ETag/Last-Modified, byte ranges and .br/.gz variants
+    where they exist. With w, h or format, serves a resized variant of an
+    image instead (e.g. /files/<logo>?w=64&format=webp), with w and h rounded
+    up to THUMBNAIL_SIZES, rendered once and cached on disk.
+    """
+    if w is None and h is None and format is None:
+        return await storage.response(name, request.headers)
+    return await thumbnails.response(name, w, h, format and format.lower(), request.headers)
 
-    return {"filename": file.filename, "file_url": file_url, "file_type": file.content_type}
 
-app.mount("/files", StaticFiles(directory="uploads"))
\ No newline at end of file
+import routes.UserRoutes  # registers the /admin/users endpoints on app
\ No newline at end of file
@@ -14,4 +14,14 @@ class UserUpdate(BaseModel):
 class UserResponse(BaseModel):
     id: str
     username: str
+    role: str
+
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
     role: str
\ No newline at end of file
@@ -0,0 +1,159 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from repositories.CompanySearch import MAX_PREFIX_LENGTH, tokenize
+
+# Attachment text search is backed by one ``attachment_pages`` document per PDF
+# page, keyed "<sha256>:<page>", with the page's distinct words in a multikey
+# indexed ``terms`` array (the same scheme as the companies' searchKeys, whole
+# words only). Pages belong to file content, not to companies; company_texts
+# maps a content hash back to the companies that reference it.
+SNIPPET_CHARS = 160
+
+
+def page_terms(text: str) -> List[str]:
+    return sorted({token[:MAX_PREFIX_LENGTH] for token in tokenize(text)})
+
+
+def query_terms(search: str) -> List[str]:
+    return page_terms(search)
+
+
+def page_documents(sha256: str, pages: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {"_id": f"{sha256}:{number}", "sha256": sha256, "page": number, "text": text, "terms": page_terms(text)}
+        for number, text in enumerate(pages, start=1)
+        if text.strip()
+    ]
+
+
+def terms_pattern(terms: List[str]) -> re.Pattern:
+    # Terms are cut to MAX_PREFIX_LENGTH, so a longer word matches on its prefix.
+    return re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")", re.IGNORECASE)
+
+
+def page_score(text: str, pattern: re.Pattern) -> int:
+    return len(pattern.findall(text))
+
+
+def snippet(text: str, pattern: re.Pattern, chars: int = SNIPPET_CHARS) -> str:
+    """A window of the page around the first query word, whitespace collapsed."""
+    text = " ".join(text.split())
+    match = pattern.search(text)
+    start = max(0, (match.start() if match else 0) - chars // 3)
+    end = min(len(text), start + chars)
+    return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+
+
+def file_name(stored_name: str) -> str:
+    # Stored names are "<sha256>_<original name>".
+    return stored_name.split("_", 1)[1] if "_" in stored_name else stored_name
+
+
+async def index_pages(pages_collection, sha256: str, pages: List[str]) -> None:
+    """Writes the page documents for one file's content; safe to repeat."""
+    documents = page_documents(sha256, pages)
+    if documents:
+        await pages_collection.bulk_write(
+            [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents], ordered=False
+        )
+
+
+async def backfill_page_index(texts_collection, pages_collection, batch_size: int = 100) -> None:
+    """Startup step: moves the pages of texts extracted before attachment search existed into the index."""
+    while True:
+        missing = await texts_collection.find({"indexed": {"$ne": True}}, {"pages": 1}).limit(batch_size).to_list(batch_size)
+        if not missing:
+            break
+        for text in missing:
+            await index_pages(pages_collection, text["_id"], text.get("pages") or [])
+        await texts_collection.bulk_write(
+            [UpdateOne({"_id": text["_id"]}, {"$set": {"indexed": True}, "$unset": {"pages": ""}}) for text in missing],
+            ordered=False,
+        )
+        print(f"Indexed attachment pages for {len(missing)} files")
+    # Records indexed before pages were kept only in attachment_pages still carry a copy.
+    result = await texts_collection.update_many({"pages": {"$exists": True}}, {"$unset": {"pages": ""}})
+    if result.modified_count:
+        print(f"Dropped page copies from {result.modified_count} attachment text records")
+
+
+class AttachmentSearch:
+    def __init__(self, pages_collection, company_texts_collection, companies_collection, max_candidates: int = 200):
+        self.pages = pages_collection
+        self.company_texts = company_texts_collection
+        self.companies = companies_collection
+        self.max_candidates = max_candidates
+
+    async def search(self, search: str, limit: int = 20, hits_per_company: int = 3,
+                     skip: int = 0) -> Optional[Dict[str, Any]]:
+        """Companies whose attachments contain every word of the search, with page hits.
+
+        Matching pages are counted per file on the server, so every matching
+        company is ranked (most matching pages first; ``total`` of them) and
+        reachable with ``skip``. Page text is read only for the companies
+        returned, at most ``max_candidates`` pages each, to score their hits
+        and build snippets.
+        """
+        terms = query_terms(search)
+        if not terms:
+            return None
+        query = {"terms": {"$all": terms}}
+        pages_by_sha = {
+            group["_id"]: group["pages"]
+            async for group in self.pages.aggregate(
+                [{"$match": query}, {"$group": {"_id": "$sha256", "pages": {"$sum": 1}}}]
+            )
+        }
+        if not pages_by_sha:
+            return {"companies": [], "total": 0}
+
+        files_by_company: Dict[Any, List[Dict[str, Any]]] = {}
+        async for company_text in self.company_texts.find({"files.sha256": {"$in": list(pages_by_sha)}}, {"files": 1}):
+            files_by_company[company_text["_id"]] = [
+                file for file in company_text["files"] if file["sha256"] in pages_by_sha
+            ]
+        page_hits = {
+            company_id: sum(pages_by_sha[file["sha256"]] for file in files)
+            for company_id, files in files_by_company.items()
+        }
+        ranked_ids = sorted(page_hits, key=lambda company_id: (-page_hits[company_id], str(company_id)))
+        ranked_ids = ranked_ids[skip:skip + limit]
+
+        pattern = terms_pattern(terms)
+        results: Dict[Any, Dict[str, Any]] = {}
+        for company_id in ranked_ids:
+            files = files_by_company[company_id]
+            pages = await self.pages.find(
+                {**query, "sha256": {"$in": sorted({file["sha256"] for file in files})}},
+                {"sha256": 1, "page": 1, "text": 1},
+            ).sort([("sha256", 1), ("page", 1)]).limit(self.max_candidates).to_list(None)
+            hits_by_sha: Dict[str, List[Dict[str, Any]]] = {}
+            for page in pages:
+                hits_by_sha.setdefault(page["sha256"], []).append(
+                    {"page": page["page"], "score": page_score(page["text"], pattern), "text": page["text"]}
+                )
+            hits = [
+                {"stored_name": file["stored_name"], "file_name": file_name(file["stored_name"]), **hit}
+                for file in files
+                for hit in hits_by_sha.get(file["sha256"], [])
+            ]
+            hits.sort(key=lambda hit: (-hit["score"], hit["file_name"], hit["page"]))
+            results[company_id] = {
+                "id": str(company_id),
+                "name": None,
+                "score": sum(hit["score"] for hit in hits),
+                "page_hits": page_hits[company_id],
+                # Snippets only for the hits that are returned.
+                "hits": [
+                    {**{key: value for key, value in hit.items() if key != "text"},
+                     "snippet": snippet(hit["text"], pattern)}
+                    for hit in hits[:hits_per_company]
+                ],
+            }
+
+        async for company in self.companies.find({"_id": {"$in": ranked_ids}}, {"name": 1}):
+            results[company["_id"]]["name"] = company.get("name")
+        return {"companies": [results[company_id] for company_id in ranked_ids], "total": len(page_hits)}
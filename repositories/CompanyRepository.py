@@ -0,0 +1,250 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from repositories.CompanySections import SectionConflict, section_updates
+from repositories.CompanySearch import SEARCH_FIELDS, rank, search_keys
+from repositories.CountCache import CountCache
+from repositories.Indexes import QueryShapes
+
+# How list pages get their total: "exact" (count_documents), "estimated"
+# (collection metadata when unfiltered), "cached" (TTL cache per filter,
+# cleared on writes) or "none" (no total at all).
+COUNT_STRATEGIES = ["exact", "estimated", "cached", "none"]
+
+# Documents per bulk_write / $in batch in the multi-company operations.
+WRITE_BATCH_SIZE = 1000
+
+# Internal bookkeeping fields that never leave the repository.
+PUBLIC_PROJECTION = {"searchKeys": 0}
+
+
+class CompanyRepository:
+    """Async data access for the ``companies`` collection.
+
+    ``collection`` is anything exposing the Motor collection API: a Motor
+    collection in production or ``MemoryDatabase`` in tests.
+    """
+
+    def __init__(
+        self,
+        collection,
+        count_strategy: str = "exact",
+        count_cache_ttl: float = 30.0,
+        search_max_candidates: int = 2000,
+    ):
+        if count_strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Unknown count strategy: {count_strategy}")
+        self.collection = collection
+        self.count_strategy = count_strategy
+        self.count_cache = CountCache(ttl=count_cache_ttl)
+        self.search_max_candidates = search_max_candidates
+        self.query_shapes = QueryShapes()
+
+    async def find_page(
+        self,
+        query: Dict[str, Any],
+        skip: int = 0,
+        limit: int = 100,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        self.query_shapes.record(query, sort)
+        cursor = self.collection.find(query, projection or PUBLIC_PROJECTION)
+        if sort:
+            cursor = cursor.sort(sort)
+        return await cursor.skip(skip).limit(limit).to_list(limit or None)
+
+    async def iterate(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Streams every matching company in _id order, ``batch_size`` documents per round trip."""
+        sort = [("_id", 1)]
+        self.query_shapes.record(query, sort)
+        cursor = self.collection.find(query, projection or PUBLIC_PROJECTION).sort(sort).batch_size(batch_size)
+        async for document in cursor:
+            yield document
+
+    async def search_page(
+        self,
+        query: Dict[str, Any],
+        search: str,
+        skip: int = 0,
+        limit: int = 100,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Relevance-ordered page over the first ``search_max_candidates`` matches in _id order.
+
+        Matches past that window are not ranked: they follow the ranked ones in
+        _id order, so every match is reachable and the total count still holds.
+        """
+        self.query_shapes.record(query, [("_id", 1)])
+        rank_projection = {field: 1 for field in SEARCH_FIELDS}
+        window = await self.collection.find(query, rank_projection).sort("_id", 1).limit(
+            self.search_max_candidates).to_list(None)
+        ranked = rank(window, search)
+        page_ids = [company["_id"] for company in (ranked[skip:skip + limit] if limit else ranked[skip:])]
+        if window and len(window) == self.search_max_candidates and (not limit or skip + limit > len(window)):
+            rest = self.collection.find({"$and": [query, {"_id": {"$gt": window[-1]["_id"]}}]}, {"_id": 1})
+            rest = rest.sort("_id", 1).skip(max(0, skip - len(window)))
+            if limit:
+                rest = rest.limit(limit - len(page_ids))
+            page_ids += [document["_id"] for document in await rest.to_list(None)]
+        if not page_ids:
+            return []
+        documents = await self.collection.find({"_id": {"$in": page_ids}}, projection or PUBLIC_PROJECTION).to_list(None)
+        by_id = {document["_id"]: document for document in documents}
+        return [by_id[company_id] for company_id in page_ids if company_id in by_id]
+
+    async def count(self, query: Dict[str, Any]) -> Optional[int]:
+        if self.count_strategy == "none":
+            return None
+        if self.count_strategy == "estimated" and not query:
+            return await self.collection.estimated_document_count()
+        if self.count_strategy == "cached":
+            count = self.count_cache.get(query)
+            if count is None:
+                count = await self.collection.count_documents(query)
+                self.count_cache.set(query, count)
+            return count
+        return await self.collection.count_documents(query)
+
+    async def get(self, company_id: ObjectId) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": company_id}, PUBLIC_PROJECTION)
+
+    async def get_version(self, company_id: ObjectId) -> Optional[int]:
+        """Current version of a company, or None if it does not exist; for conditional requests."""
+        company = await self.collection.find_one({"_id": company_id}, {"version": 1})
+        return company.get("version", 0) if company else None
+
+    async def backfill_versions(self) -> int:
+        """Gives companies written before versioning a version, so every ETag is version-based."""
+        result = await self.collection.update_many({"version": {"$exists": False}}, {"$set": {"version": 1}})
+        return result.modified_count
+
+    async def insert(self, company_data: Dict[str, Any]) -> str:
+        company_data["searchKeys"] = search_keys(company_data)
+        company_data["version"] = 1
+        company_data["updatedAt"] = datetime.now(timezone.utc)
+        result = await self.collection.insert_one(company_data)
+        self.count_cache.clear()
+        return str(result.inserted_id)
+
+    async def insert_many(self, companies: List[Dict[str, Any]]) -> Dict[int, str]:
+        """Inserts a batch unordered, so one bad row does not stop the rest.
+
+        Every document gets its ``_id`` assigned in place; returns the error
+        message of each position Mongo rejected.
+        """
+        now = datetime.now(timezone.utc)
+        for company_data in companies:
+            company_data.setdefault("_id", ObjectId())
+            company_data["searchKeys"] = search_keys(company_data)
+            company_data["version"] = 1
+            company_data["updatedAt"] = now
+        errors = {}
+        try:
+            await self.collection.insert_many(companies, ordered=False)
+        except BulkWriteError as e:
+            errors = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+        self.count_cache.clear()
+        return errors
+
+    async def update(self, company_id: ObjectId, company_data: Dict[str, Any]):
+        if any(field in company_data for field in SEARCH_FIELDS):
+            current = await self.collection.find_one({"_id": company_id}, {field: 1 for field in SEARCH_FIELDS})
+            if current:
+                company_data["searchKeys"] = search_keys({**current, **company_data})
+        result = await self.collection.update_one(
+            {"_id": company_id},
+            {"$set": {**company_data, "updatedAt": datetime.now(timezone.utc)}, "$inc": {"version": 1}},
+        )
+        self.count_cache.clear()
+        return result
+
+    async def update_many(self, companies: List[Dict[str, Any]], company_data: Dict[str, Any]) -> int:
+        """Applies the same change to every company in ``companies``; returns how many were modified.
+
+        ``companies`` are the selected documents with at least ``_id`` and, when the
+        change touches a search field, every SEARCH_FIELD, because searchKeys are
+        recomputed per document. Otherwise each batch is a single update_many.
+        """
+        now = datetime.now(timezone.utc)
+        refresh_keys = any(field in company_data for field in SEARCH_FIELDS)
+        modified = 0
+        for start in range(0, len(companies), WRITE_BATCH_SIZE):
+            batch = companies[start:start + WRITE_BATCH_SIZE]
+            if refresh_keys:
+                result = await self.collection.bulk_write([
+                    UpdateOne({"_id": company["_id"]}, {
+                        "$set": {**company_data, "searchKeys": search_keys({**company, **company_data}), "updatedAt": now},
+                        "$inc": {"version": 1},
+                    })
+                    for company in batch
+                ], ordered=False)
+            else:
+                result = await self.collection.update_many(
+                    {"_id": {"$in": [company["_id"] for company in batch]}},
+                    {"$set": {**company_data, "updatedAt": now}, "$inc": {"version": 1}},
+                )
+            modified += result.modified_count
+        self.count_cache.clear()
+        return modified
+
+    async def patch_section(
+        self,
+        company_id: ObjectId,
+        section: str,
+        operations: List[Dict[str, Any]],
+        expected_version: Optional[int] = None,
+    ) -> Optional[Tuple[List[Any], List[Any], int]]:
+        """Applies item-level operations to one section in a single version-guarded update.
+
+        One step is sent as a targeted update ($push/$pull/positional $set).
+        Several steps cannot share one update (they all touch the same array),
+        and running them one by one would leave the first ones applied if
+        another write got in between, so the computed section is written in one
+        $set instead. Either everything is applied or, if the company changed
+        since it was read, nothing is and SectionConflict is raised. Returns the
+        items before and after and the new version, or None if there is no such
+        company.
+        """
+        company = await self.collection.find_one({"_id": company_id}, {section: 1, "version": 1})
+        if company is None:
+            return None
+        version = company.get("version", 0)
+        if expected_version is not None and expected_version != version:
+            raise SectionConflict(f"Company is at version {version}, not {expected_version}")
+        before = company.get(section) or []
+        after, updates = section_updates(section, before, operations)
+        if not updates:
+            return before, after, version
+
+        update, array_filters = updates[0] if len(updates) == 1 else ({"$set": {section: after}}, None)
+        update = {**update, "$inc": {"version": 1}}
+        update["$set"] = {**update.get("$set", {}), "updatedAt": datetime.now(timezone.utc)}
+        # None matches documents written before versioning too.
+        result = await self.collection.update_one({"_id": company_id, "version": company.get("version")}, update,
+                                                  array_filters=array_filters)
+        if result.matched_count == 0:
+            raise SectionConflict("Company changed during the update; nothing was applied, reload and retry")
+        return before, after, version + 1
+
+    async def delete_many(self, company_ids: List[ObjectId]) -> int:
+        deleted = 0
+        for start in range(0, len(company_ids), WRITE_BATCH_SIZE):
+            result = await self.collection.delete_many({"_id": {"$in": company_ids[start:start + WRITE_BATCH_SIZE]}})
+            deleted += result.deleted_count
+        self.count_cache.clear()
+        return deleted
+
+    async def delete(self, company_id: ObjectId):
+        result = await self.collection.delete_one({"_id": company_id})
+        self.count_cache.clear()
+        return result
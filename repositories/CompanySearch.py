@@ -0,0 +1,73 @@
+import re
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+# Company search is backed by a ``searchKeys`` array on each document with a
+# multikey index on it. Short fields contribute every token prefix so a query
+# like "tec cai" finds "Tech Hub, Cairo"; long free-text fields only contribute
+# whole words to keep the index small.
+PREFIX_FIELDS = {"name": 8, "category": 3, "location": 3}
+WORD_FIELDS = {"mission": 1, "description": 1}
+SEARCH_FIELDS = list(PREFIX_FIELDS) + list(WORD_FIELDS)
+MAX_PREFIX_LENGTH = 15
+SEARCH_INDEX_NAME = "companies_search_keys"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Any) -> List[str]:
+    if not isinstance(text, str):
+        return []
+    return _TOKEN.findall(text.lower())
+
+
+def search_keys(company_data: Dict[str, Any]) -> List[str]:
+    keys = set()
+    for field in PREFIX_FIELDS:
+        for token in tokenize(company_data.get(field)):
+            for end in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                keys.add(token[:end])
+    for field in WORD_FIELDS:
+        for token in tokenize(company_data.get(field)):
+            keys.add(token[:MAX_PREFIX_LENGTH])
+    return sorted(keys)
+
+
+def search_query(search: str) -> Dict[str, Any]:
+    """Every query token has to match a key; input is never treated as a pattern."""
+    tokens = sorted({token[:MAX_PREFIX_LENGTH] for token in tokenize(search)})
+    if not tokens:
+        return {}
+    return {"searchKeys": {"$all": tokens}}
+
+
+def score(company_data: Dict[str, Any], search: str) -> float:
+    """Field-weighted relevance: whole-word hits count double, prefix hits once."""
+    total = 0.0
+    for token in tokenize(search):
+        for field, weight in {**PREFIX_FIELDS, **WORD_FIELDS}.items():
+            words = tokenize(company_data.get(field))
+            if token in words:
+                total += 2 * weight
+            elif field in PREFIX_FIELDS and any(word.startswith(token) for word in words):
+                total += weight
+    return total
+
+
+def rank(companies: List[Dict[str, Any]], search: str) -> List[Dict[str, Any]]:
+    return sorted(companies, key=lambda company: (-score(company, search), company.get("name") or ""))
+
+
+async def backfill_search_keys(collection, batch_size: int = 500) -> None:
+    """Startup step: computes searchKeys for documents written before search indexing existed."""
+    projection = {field: 1 for field in SEARCH_FIELDS}
+    while True:
+        missing = await collection.find({"searchKeys": {"$exists": False}}, projection).limit(batch_size).to_list(batch_size)
+        if not missing:
+            break
+        await collection.bulk_write([
+            UpdateOne({"_id": company_data["_id"]}, {"$set": {"searchKeys": search_keys(company_data)}})
+            for company_data in missing
+        ], ordered=False)
+        print(f"Backfilled searchKeys for {len(missing)} companies")
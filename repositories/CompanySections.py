@@ -0,0 +1,86 @@
+import copy
+from typing import Any, Dict, List, Tuple
+
+# Company fields holding lists of {"key": ..., ...} items that can be edited item by item.
+SECTION_FIELDS = ["investors", "financialStatement", "assessment", "portfolio", "dynamicSections"]
+
+
+class InvalidOperation(ValueError):
+    pass
+
+
+class SectionConflict(ValueError):
+    pass
+
+
+def _positions(items: List[Any], operation: Dict[str, Any]) -> List[int]:
+    if operation.get("index") is not None:
+        index = operation["index"]
+        if not 0 <= index < len(items):
+            raise InvalidOperation(f"Index {index} is out of range")
+        return [index]
+    if operation.get("key") is not None:
+        positions = [i for i, item in enumerate(items) if isinstance(item, dict) and item.get("key") == operation["key"]]
+        if not positions:
+            raise InvalidOperation(f"No item with key {operation['key']!r}")
+        return positions
+    raise InvalidOperation(f"'{operation['op']}' needs a key or an index")
+
+
+def section_updates(section: str, items: List[Any], operations: List[Dict[str, Any]]) -> Tuple[List[Any], List[Tuple[Dict[str, Any], list]]]:
+    """Checks the operations against the current items and translates each into a targeted update.
+
+    Returns the items as they will be after the operations, and one
+    ``(update, array_filters)`` pair per step. Only reorder writes the whole
+    array. Keys stay unique: add and replace reject a key another item has.
+    """
+    items = copy.deepcopy(items)
+    updates = []
+    for operation in operations:
+        op = operation["op"]
+        if op == "add":
+            item = operation["item"]
+            if any(isinstance(existing, dict) and existing.get("key") == item.get("key") for existing in items):
+                raise InvalidOperation(f"An item with key {item.get('key')!r} already exists")
+            position = operation.get("position")
+            if position is None:
+                items.append(item)
+                updates.append(({"$push": {section: item}}, None))
+            else:
+                if not 0 <= position <= len(items):
+                    raise InvalidOperation(f"Position {position} is out of range")
+                items.insert(position, item)
+                updates.append(({"$push": {section: {"$each": [item], "$position": position}}}, None))
+        elif op == "replace":
+            positions = _positions(items, operation)
+            key = operation["item"].get("key")
+            if any(isinstance(existing, dict) and existing.get("key") == key
+                   for position, existing in enumerate(items) if position not in positions):
+                raise InvalidOperation(f"An item with key {key!r} already exists")
+            for position in positions:
+                items[position] = operation["item"]
+            if operation.get("index") is not None:
+                updates.append(({"$set": {f"{section}.{positions[0]}": operation["item"]}}, None))
+            else:
+                updates.append(({"$set": {f"{section}.$[item]": operation["item"]}}, [{"item.key": operation["key"]}]))
+        elif op == "remove":
+            positions = _positions(items, operation)
+            if operation.get("index") is not None:
+                # Mongo cannot pull by position: null the slot, then pull nulls.
+                del items[positions[0]]
+                items = [item for item in items if item is not None]
+                updates.append(({"$unset": {f"{section}.{positions[0]}": ""}}, None))
+                updates.append(({"$pull": {section: None}}, None))
+            else:
+                items = [item for item in items if not (isinstance(item, dict) and item.get("key") == operation["key"])]
+                updates.append(({"$pull": {section: {"key": operation["key"]}}}, None))
+        elif op == "reorder":
+            keys = operation.get("keys") or []
+            by_key = {item.get("key"): item for item in items if isinstance(item, dict)}
+            if len(by_key) != len(items) or sorted(keys, key=str) != sorted(by_key, key=str):
+                raise InvalidOperation("reorder needs every current key exactly once, and unique keys")
+            items = [by_key[key] for key in keys]
+            updates.append(({"$set": {section: items}}, None))
+        else:
+            raise InvalidOperation(f"Unknown operation {op!r}")
+    return items, updates
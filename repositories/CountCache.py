@@ -0,0 +1,43 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def normalize_query(query: Dict[str, Any]) -> str:
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+class CountCache:
+    """Per-filter document counts that expire after ``ttl`` seconds.
+
+    Entries are per process, so other workers only see a write once their own
+    copy expires; keep ``ttl`` short.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, query: Dict[str, Any]) -> Optional[int]:
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        count, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return count
+
+    def set(self, query: Dict[str, Any], count: int) -> None:
+        key = normalize_query(query)
+        self._entries[key] = (count, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,88 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "motor" talks to MONGODB_URL; "memory" keeps everything in-process (tests, local dev).
+MONGODB_BACKEND = os.getenv("MONGODB_BACKEND", "motor")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "10000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "20000"))
+
+
+_clients = {}
+
+
+def create_client(mongodb_url: str):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(
+        mongodb_url,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+    )
+
+
+def get_client(mongodb_url: str):
+    """One client per URL per process, so warm serverless invocations reuse its connection pool."""
+    if mongodb_url not in _clients:
+        _clients[mongodb_url] = create_client(mongodb_url)
+    return _clients[mongodb_url]
+
+
+class LazyCollection:
+    """Stands in for a Motor collection until it is first used."""
+
+    def __init__(self, database: "LazyDatabase", name: str):
+        self._database = database
+        self.name = name
+
+    def __getattr__(self, attribute):
+        return getattr(self._database.resolve()[self.name], attribute)
+
+
+class LazyDatabase:
+    """Creates the Motor client on first use instead of at import.
+
+    Building a client resolves mongodb+srv:// DNS records and starts monitor
+    threads, which a serverless cold start pays for even when the request
+    never touches the database.
+    """
+
+    def __init__(self, mongodb_url: str, name: str):
+        self._mongodb_url = mongodb_url
+        self.name = name
+        self._database = None
+
+    def resolve(self):
+        if self._database is None:
+            self._database = get_client(self._mongodb_url)[self.name]
+        return self._database
+
+    def __getitem__(self, name: str) -> LazyCollection:
+        return LazyCollection(self, name)
+
+    def __getattr__(self, attribute):
+        return getattr(self.resolve(), attribute)
+
+
+def get_database(mongodb_url: str = None, database_name: str = None, backend: str = None):
+    backend = backend or MONGODB_BACKEND
+    mongodb_url = mongodb_url or os.getenv("MONGODB_URL")
+    database_name = database_name or os.getenv("DATABASE_NAME")
+
+    if backend == "memory":
+        from repositories.MemoryDatabase import MemoryDatabase
+
+        return MemoryDatabase(database_name or "memory")
+    if backend == "motor":
+        return LazyDatabase(mongodb_url, database_name)
+    raise ValueError(f"Unknown MONGODB_BACKEND: {backend}")
@@ -0,0 +1,125 @@
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from repositories.CompanySearch import SEARCH_INDEX_NAME
+
+# Every index the application relies on, per collection. The company indexes
+# follow the list_companies filters (category, size, location as equality
+# prefixes) with _id last so filtered pages come back in index order.
+INDEX_MANIFEST = {
+    "companies": [
+        {"name": "companies_category_size_location", "keys": [("category", 1), ("size", 1), ("location", 1), ("_id", 1)]},
+        {"name": "companies_size_location", "keys": [("size", 1), ("location", 1), ("_id", 1)]},
+        {"name": "companies_location", "keys": [("location", 1), ("_id", 1)]},
+        {"name": "companies_name", "keys": [("name", 1), ("_id", 1)]},
+        {"name": SEARCH_INDEX_NAME, "keys": [("searchKeys", 1)]},
+    ],
+    "users": [
+        {"name": "users_username_unique", "keys": [("username", 1)], "unique": True},
+    ],
+    "attachment_texts": [
+        {"name": "attachment_texts_stored_names", "keys": [("stored_names", 1)]},
+    ],
+    "attachment_pages": [
+        {"name": "attachment_pages_terms", "keys": [("terms", 1)]},
+        {"name": "attachment_pages_sha256", "keys": [("sha256", 1)]},
+    ],
+    "company_texts": [
+        {"name": "company_texts_files_sha256", "keys": [("files.sha256", 1)]},
+    ],
+}
+
+
+async def ensure_indexes(db, manifest: Dict[str, List[Dict[str, Any]]] = None) -> None:
+    """Creates any manifest index that does not exist yet; safe to run on every startup."""
+    for collection_name, indexes in (manifest or INDEX_MANIFEST).items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        for index in indexes:
+            current = existing.get(index["name"])
+            if current is not None:
+                if [tuple(key) for key in current["key"]] != index["keys"]:
+                    print(f"Index {collection_name}.{index['name']} exists with different keys: {current['key']}")
+                continue
+            try:
+                await collection.create_index(index["keys"], name=index["name"], unique=index.get("unique", False))
+                print(f"Created index {collection_name}.{index['name']}")
+            except OperationFailure as e:
+                print(f"Could not create index {collection_name}.{index['name']}: {e}")
+
+
+def _shape(value: Any) -> Any:
+    """Replaces literal values so queries that differ only in values share a shape."""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # Keep $and/$or clauses apart, collapse $in/$all value lists.
+        if any(isinstance(item, dict) for item in value):
+            return [_shape(item) for item in value]
+        return [1]
+    return 1
+
+
+class QueryShapes:
+    """Remembers the distinct filter/sort shapes a repository has run, for index diagnostics."""
+
+    def __init__(self, max_shapes: int = 200):
+        self.max_shapes = max_shapes
+        self._shapes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def record(self, query: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None) -> None:
+        key = json.dumps({"filter": _shape(query), "sort": sort or []}, sort_keys=True)
+        entry = self._shapes.get(key)
+        if entry is None:
+            entry = {"filter": query, "sort": sort, "count": 0}
+            self._shapes[key] = entry
+            while len(self._shapes) > self.max_shapes:
+                self._shapes.popitem(last=False)
+        entry["count"] += 1
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return list(self._shapes.items())
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    stages = [plan]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages.extend(_plan_stages(child))
+    return stages
+
+
+async def index_report(collection, shapes: Optional[QueryShapes] = None) -> Dict[str, Any]:
+    """Index usage counters plus the winning plan of every recorded query shape."""
+    usage = []
+    for stats in await collection.aggregate([{"$indexStats": {}}]).to_list(None):
+        usage.append({
+            "name": stats["name"],
+            "key": stats.get("key"),
+            "ops": stats.get("accesses", {}).get("ops", 0),
+            "since": stats.get("accesses", {}).get("since"),
+        })
+
+    queries = []
+    for shape, entry in shapes.items() if shapes else []:
+        cursor = collection.find(entry["filter"])
+        if entry["sort"]:
+            cursor = cursor.sort(entry["sort"])
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+        queries.append({
+            "shape": json.loads(shape),
+            "count": entry["count"],
+            "indexes": [stage["indexName"] for stage in stages if "indexName" in stage],
+            "collection_scan": any(stage.get("stage") == "COLLSCAN" for stage in stages),
+        })
+
+    return {
+        "indexes": usage,
+        "queries": queries,
+        "collection_scans": [query["shape"] for query in queries if query["collection_scan"]],
+    }
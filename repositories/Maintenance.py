@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import os
+
+from repositories.AttachmentSearch import backfill_page_index
+from repositories.CompanyRepository import CompanyRepository
+from repositories.CompanySearch import backfill_search_keys
+from repositories.Indexes import ensure_indexes
+
+
+async def run_maintenance(db, search_mode: str = "index") -> None:
+    """Idempotent schema upkeep: indexes, then backfills for documents written by older code.
+
+    Runs at startup on a long-lived server. Serverless deployments skip it
+    (it would otherwise run on every cold start) and run this module instead
+    after a deploy.
+    """
+    await ensure_indexes(db)
+    await CompanyRepository(db["companies"]).backfill_versions()
+    if search_mode == "index":
+        await backfill_search_keys(db["companies"])
+    await backfill_page_index(db["attachment_texts"], db["attachment_pages"])
+
+
+async def _main():
+    from repositories.Database import get_database
+
+    parser = argparse.ArgumentParser(description="Create indexes and backfill fields added by newer versions.")
+    parser.add_argument("command", choices=["run"])
+    parser.parse_args()
+
+    await run_maintenance(get_database(), os.getenv("COMPANY_SEARCH_MODE", "index"))
+    print("Maintenance done")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
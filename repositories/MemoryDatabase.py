@@ -0,0 +1,668 @@
+import asyncio
+import copy
+import itertools
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+
+# In-process stand-in for a Motor database. It implements the subset of the
+# async collection API the repositories use, so handlers can run against it in
+# tests and local development without a MongoDB server.
+
+_MISSING = object()
+
+
+def _get_values(document: Any, path: str) -> List[Any]:
+    """Resolves a dotted path, descending into arrays the way MongoDB does."""
+    values = [document]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    found.append(value[int(part)])
+                else:
+                    for element in value:
+                        if isinstance(element, dict) and part in element:
+                            found.append(element[part])
+        values = found
+    return values
+
+
+def _expand(values: List[Any]) -> List[Any]:
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _compare(value: Any, other: Any, operator: str) -> bool:
+    try:
+        if operator == "$gt":
+            return value > other
+        if operator == "$gte":
+            return value >= other
+        if operator == "$lt":
+            return value < other
+        return value <= other
+    except TypeError:
+        return False
+
+
+def _match_operator(values: List[Any], operator: str, argument: Any, condition: Dict[str, Any]) -> bool:
+    candidates = _expand(values)
+    if operator == "$eq":
+        return _match_value(values, argument)
+    if operator == "$ne":
+        return not _match_value(values, argument)
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        return any(_compare(value, argument, operator) for value in candidates if value is not None)
+    if operator == "$in":
+        try:
+            options = set(argument)
+        except TypeError:  # unhashable options (documents, lists)
+            options = None
+        if options is None or any(isinstance(option, re.Pattern) for option in options):
+            return any(_match_value(values, option) for option in argument)
+        return any(value in options for value in candidates if _hashable(value)) or (None in options and not values)
+    if operator == "$nin":
+        return not any(_match_value(values, option) for option in argument)
+    if operator == "$exists":
+        return bool(values) == bool(argument)
+    if operator == "$all":
+        return all(_match_value(values, option) for option in argument)
+    if operator == "$size":
+        return any(isinstance(value, list) and len(value) == argument for value in values)
+    if operator == "$elemMatch":
+        return any(
+            isinstance(value, list) and any(isinstance(e, dict) and _matches(e, argument) for e in value)
+            for value in values
+        )
+    if operator == "$regex":
+        flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+        pattern = argument if isinstance(argument, re.Pattern) else re.compile(argument, flags)
+        return any(isinstance(value, str) and pattern.search(value) for value in candidates)
+    if operator == "$options":
+        return True
+    if operator == "$not":
+        return not _match_condition(values, argument)
+    raise ValueError(f"Unsupported query operator: {operator}")
+
+
+def _match_value(values: List[Any], expected: Any) -> bool:
+    if isinstance(expected, re.Pattern):
+        return any(isinstance(value, str) and expected.search(value) for value in _expand(values))
+    if expected is None and not values:
+        return True
+    return any(value == expected for value in _expand(values))
+
+
+def _match_condition(values: List[Any], condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        return all(
+            _match_operator(values, operator, argument, condition)
+            for operator, argument in condition.items()
+        )
+    return _match_value(values, condition)
+
+
+def _matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(_matches(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(_matches(document, clause) for clause in condition):
+                return False
+        elif not _match_condition(_get_values(document, key), condition):
+            return False
+    return True
+
+
+def _project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(document)
+    include_id = bool(projection.get("_id", 1))
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(fields.values()):
+        projected = {}
+        for key in fields:
+            head = key.split(".")[0]
+            if head in document:
+                projected[head] = copy.deepcopy(document[head])
+        if include_id and "_id" in document:
+            projected["_id"] = document["_id"]
+        return projected
+    projected = copy.deepcopy(document)
+    for key in fields:
+        projected.pop(key, None)
+    if not include_id:
+        projected.pop("_id", None)
+    return projected
+
+
+def _hashable(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool, ObjectId))
+
+
+def _index_keys(document: Dict[str, Any], field: str) -> set:
+    return {value for value in _expand(_get_values(document, field)) if _hashable(value)}
+
+
+def _lookup_values(condition: Any) -> Optional[tuple]:
+    """Returns ("any"|"all", values) when an equality-style condition can use a lookup table."""
+    if isinstance(condition, dict):
+        if len(condition) != 1:
+            return None
+        operator, argument = next(iter(condition.items()))
+        if operator == "$eq" and _hashable(argument):
+            return "any", [argument]
+        if operator in ("$in", "$all") and argument and all(_hashable(value) for value in argument):
+            return ("any" if operator == "$in" else "all"), list(argument)
+        return None
+    if _hashable(condition):
+        return "any", [condition]
+    return None
+
+
+def _sort_key(value: Any):
+    # MongoDB orders missing/null values before everything else.
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, ObjectId):
+        return (3, value)
+    return (4, str(value))
+
+
+def _first_value(document: Dict[str, Any], path: str) -> Any:
+    values = _get_values(document, path)
+    return values[0] if values else _MISSING
+
+
+def _set_path(document: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        if isinstance(target, list):
+            target = target[int(part)]
+        else:
+            target = target.setdefault(part, {})
+    if isinstance(target, list):
+        target[int(parts[-1])] = value
+    else:
+        target[parts[-1]] = value
+
+
+def _unset_path(document: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        target = target[int(part)] if isinstance(target, list) else target.get(part)
+        if target is None:
+            return
+    if isinstance(target, list):
+        target[int(parts[-1])] = None
+    elif isinstance(target, dict):
+        target.pop(parts[-1], None)
+
+
+def _group(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """$group on one "$field" (or null) with $sum accumulators, the subset the repositories use."""
+    def evaluate(document: Dict[str, Any], expression: Any, default: Any) -> Any:
+        if isinstance(expression, str) and expression.startswith("$"):
+            value = _first_value(document, expression[1:])
+            return default if value is _MISSING else value
+        return expression
+
+    accumulators = {name: accumulator for name, accumulator in spec.items() if name != "_id"}
+    if any(set(accumulator) != {"$sum"} for accumulator in accumulators.values()):
+        raise ValueError(f"Unsupported $group: {spec}")
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for document in documents:
+        value = evaluate(document, spec["_id"], None)
+        group = groups.setdefault(value, {"_id": value, **{name: 0 for name in accumulators}})
+        for name, accumulator in accumulators.items():
+            group[name] += evaluate(document, accumulator["$sum"], 0)
+    return list(groups.values())
+
+
+def _element_matches(element: Any, condition: Any) -> bool:
+    """$pull / arrayFilters condition against one array element."""
+    if isinstance(condition, dict) and isinstance(element, dict) and not any(k.startswith("$") for k in condition):
+        return _matches(element, condition)
+    if isinstance(condition, dict):
+        return _matches({"value": element}, {"value": condition})
+    return element == condition
+
+
+def _array_filter_conditions(array_filters: Optional[List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """{"item.key": "x"} -> {"item": {"key": "x"}}; {"item": 3} -> {"item": {"": 3}}."""
+    conditions: Dict[str, Dict[str, Any]] = {}
+    for array_filter in array_filters or []:
+        for path, condition in array_filter.items():
+            identifier, _, rest = path.partition(".")
+            conditions.setdefault(identifier, {})[rest] = condition
+    return conditions
+
+
+def _expand_positional(document: Dict[str, Any], path: str, conditions: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Concrete paths for a path with filtered positional operators ``$[identifier]``."""
+    parts = path.split(".")
+    for position, part in enumerate(parts):
+        if part.startswith("$[") and part.endswith("]"):
+            prefix = ".".join(parts[:position])
+            array = _first_value(document, prefix)
+            if not isinstance(array, list):
+                return []
+            condition = conditions.get(part[2:-1])
+            if condition is None and part != "$[]":
+                raise ValueError(f"No array filter found for identifier {part[2:-1]!r}")
+            paths = []
+            for index, element in enumerate(array):
+                if part == "$[]" or all(
+                    _element_matches(element, value) if not field else
+                    isinstance(element, dict) and _element_matches(element, {field: value})
+                    for field, value in condition.items()
+                ):
+                    rest = ".".join([prefix, str(index)] + parts[position + 1:])
+                    paths.extend(_expand_positional(document, rest, conditions))
+            return paths
+    return [path]
+
+
+def _apply_update(document: Dict[str, Any], update: Dict[str, Any], array_filters=None) -> None:
+    conditions = _array_filter_conditions(array_filters)
+    for operator, fields in update.items():
+        for field, value in fields.items():
+            for path in _expand_positional(document, field, conditions):
+                if operator == "$set":
+                    _set_path(document, path, copy.deepcopy(value))
+                elif operator == "$unset":
+                    _unset_path(document, path)
+                elif operator == "$inc":
+                    current = _first_value(document, path)
+                    _set_path(document, path, (0 if current is _MISSING else current) + value)
+                elif operator == "$push":
+                    array = _first_value(document, path)
+                    if array is _MISSING:
+                        array = []
+                        _set_path(document, path, array)
+                    if not isinstance(array, list):
+                        raise ValueError(f"The field '{path}' must be an array")
+                    if isinstance(value, dict) and "$each" in value:
+                        items = copy.deepcopy(value["$each"])
+                        position = value.get("$position", len(array))
+                        array[position:position] = items
+                    else:
+                        array.append(copy.deepcopy(value))
+                elif operator == "$pull":
+                    array = _first_value(document, path)
+                    if isinstance(array, list):
+                        array[:] = [element for element in array if not _element_matches(element, value)]
+                else:
+                    raise ValueError(f"Unsupported update operator: {operator}")
+
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or 1)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, skip: int):
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int):
+        return self
+
+    def _evaluate(self) -> List[Dict[str, Any]]:
+        matching = (doc for doc in self._collection._candidates(self._query) if _matches(doc, self._query))
+        if self._sort:
+            documents = list(matching)
+            for key, direction in reversed(self._sort):
+                documents.sort(key=lambda doc: _sort_key(_first_value(doc, key)), reverse=direction < 0)
+            documents = documents[self._skip:self._skip + self._limit if self._limit else None]
+        else:
+            documents = list(itertools.islice(matching, self._skip, self._skip + self._limit if self._limit else None))
+        return [_project(doc, self._projection) for doc in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        await self._collection._database._simulate_latency()
+        documents = self._evaluate()
+        return documents[:length] if length else documents
+
+    async def explain(self) -> Dict[str, Any]:
+        await self._collection._database._simulate_latency()
+        return self._collection._explain(self._query, self._sort)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await self.to_list(None):
+            yield document
+
+
+class MemoryCommandCursor:
+    def __init__(self, collection: "MemoryCollection", documents: List[Dict[str, Any]]):
+        self._collection = collection
+        self._documents = documents
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        await self._collection._database._simulate_latency()
+        return self._documents[:length] if length else self._documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await self.to_list(None):
+            yield document
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self._database = database
+        self.name = name
+        self._documents: Dict[Any, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[str, Any]] = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        # Hash lookups on the leading field of each index: field -> value -> {_id}.
+        self._lookups: Dict[str, Dict[Any, set]] = {}
+        self._order: Dict[Any, int] = {}
+        self._counter = itertools.count()
+        self._index_ops: Dict[str, int] = {}
+        self._created_at = datetime.now(timezone.utc)
+
+    def _plan(self, query: Dict[str, Any]) -> tuple:
+        """Picks index lookups usable for the filter: returns (matching _ids or None, index names)."""
+        selected = None
+        used = []
+        clauses = [query] + [clause for clause in query.get("$and", []) if isinstance(clause, dict)]
+        for clause in clauses:
+            for field, condition in clause.items():
+                if field != "_id" and field not in self._lookups:
+                    continue
+                lookup = _lookup_values(condition)
+                if lookup is None:
+                    continue
+                mode, values = lookup
+                if field == "_id":
+                    sets = [{value} if value in self._documents else set() for value in values]
+                else:
+                    sets = [self._lookups[field].get(value, set()) for value in values]
+                ids = set.union(*sets) if mode == "any" else set.intersection(*sets)
+                selected = ids if selected is None else selected & ids
+                used.append(next(name for name, index in self._indexes.items() if index["key"][0][0] == field))
+        return selected, used
+
+    def _candidates(self, query: Dict[str, Any], record: bool = True) -> List[Dict[str, Any]]:
+        """Narrows the scan with index lookups where the filter allows it."""
+        selected, used = self._plan(query)
+        if record:
+            for name in used:
+                self._index_ops[name] = self._index_ops.get(name, 0) + 1
+        if selected is None:
+            return list(self._documents.values())
+        return sorted((self._documents[key] for key in selected), key=lambda doc: self._order[doc["_id"]])
+
+    def _explain(self, query: Dict[str, Any], sort: List[tuple]) -> Dict[str, Any]:
+        _, used = self._plan(query)
+        if not used and sort:
+            used = [name for name, index in self._indexes.items() if index["key"][0][0] == sort[0][0]][:1]
+        if not used:
+            plan = {"stage": "COLLSCAN", "filter": query}
+        elif len(used) == 1:
+            plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": used[0]}}
+        else:
+            plan = {"stage": "FETCH", "inputStage": {
+                "stage": "AND_HASH", "inputStages": [{"stage": "IXSCAN", "indexName": name} for name in used]}}
+        return {"queryPlanner": {"namespace": f"{self._database.name}.{self.name}", "winningPlan": plan}}
+
+    def _index_document(self, document: Dict[str, Any], add: bool) -> None:
+        for field, lookup in self._lookups.items():
+            for value in _index_keys(document, field):
+                if add:
+                    lookup.setdefault(value, set()).add(document["_id"])
+                else:
+                    lookup.get(value, set()).discard(document["_id"])
+
+    def _check_unique(self, document: Dict[str, Any]) -> None:
+        for name, index in self._indexes.items():
+            if not index.get("unique"):
+                continue
+            fields = [field for field, _ in index["key"]]
+            key = [_first_value(document, field) for field in fields]
+            for other in self._candidates({fields[0]: key[0]} if _hashable(key[0]) else {}, record=False):
+                if other["_id"] != document["_id"] and [_first_value(other, f) for f in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {name}", 11000)
+
+    def _store(self, document: Dict[str, Any]) -> None:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError("E11000 duplicate key error index: _id_", 11000)
+        stored = copy.deepcopy(document)
+        self._check_unique(stored)
+        self._documents[stored["_id"]] = stored
+        self._order[stored["_id"]] = next(self._counter)
+        self._index_document(stored, add=True)
+
+    def find(self, filter=None, projection=None):
+        return MemoryCursor(self, filter or {}, projection)
+
+    async def find_one(self, filter=None, projection=None):
+        documents = await self.find(filter, projection).limit(1).to_list(1)
+        return documents[0] if documents else None
+
+    async def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        await self._database._simulate_latency()
+        self._store(document)
+        return InsertOneResult(document["_id"], True)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        """Like Mongo: unordered inserts carry on past failures, and failures raise BulkWriteError at the end."""
+        await self._database._simulate_latency()
+        write_errors = []
+        for index, document in enumerate(documents):
+            try:
+                self._store(document)
+            except DuplicateKeyError as e:
+                write_errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if write_errors:
+            raise BulkWriteError({
+                "writeErrors": write_errors, "writeConcernErrors": [],
+                "nInserted": len(documents) - len(write_errors) if not ordered else write_errors[0]["index"],
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult([document["_id"] for document in documents], True)
+
+    def _update(self, filter, update, many: bool, array_filters=None) -> UpdateResult:
+        matched = modified = 0
+        for document in self._candidates(filter):
+            if not _matches(document, filter):
+                continue
+            matched += 1
+            before = copy.deepcopy(document)
+            _apply_update(document, update, array_filters)
+            if document != before:
+                try:
+                    self._check_unique(document)
+                except DuplicateKeyError:
+                    document.clear()
+                    document.update(before)
+                    raise
+                self._index_document(before, add=False)
+                self._index_document(document, add=True)
+                modified += 1
+            if not many:
+                break
+        return UpdateResult({"n": matched, "nModified": modified, "ok": 1}, True)
+
+    async def update_one(self, filter, update, array_filters=None) -> UpdateResult:
+        await self._database._simulate_latency()
+        return self._update(filter, update, many=False, array_filters=array_filters)
+
+    async def update_many(self, filter, update, array_filters=None) -> UpdateResult:
+        await self._database._simulate_latency()
+        return self._update(filter, update, many=True, array_filters=array_filters)
+
+    async def replace_one(self, filter, replacement, upsert: bool = False) -> UpdateResult:
+        await self._database._simulate_latency()
+        return self._replace(filter, replacement, upsert)
+
+    def _replace(self, filter, replacement, upsert: bool) -> UpdateResult:
+        for document in self._candidates(filter):
+            if _matches(document, filter):
+                replacement = {**copy.deepcopy(replacement), "_id": document["_id"]}
+                self._check_unique(replacement)
+                self._index_document(document, add=False)
+                document.clear()
+                document.update(replacement)
+                self._index_document(document, add=True)
+                return UpdateResult({"n": 1, "nModified": 1, "ok": 1}, True)
+        if not upsert:
+            return UpdateResult({"n": 0, "nModified": 0, "ok": 1}, True)
+        document = copy.deepcopy(replacement)
+        if "_id" not in document and "_id" in (filter or {}) and not isinstance(filter["_id"], dict):
+            document["_id"] = filter["_id"]
+        self._store(document)
+        return UpdateResult({"n": 0, "nModified": 0, "upserted": document["_id"], "ok": 1}, True)
+
+    def _delete(self, filter, many: bool) -> DeleteResult:
+        deleted = 0
+        for document in self._candidates(filter):
+            if _matches(document, filter):
+                del self._documents[document["_id"]]
+                del self._order[document["_id"]]
+                self._index_document(document, add=False)
+                deleted += 1
+                if not many:
+                    break
+        return DeleteResult({"n": deleted, "ok": 1}, True)
+
+    async def delete_one(self, filter) -> DeleteResult:
+        await self._database._simulate_latency()
+        return self._delete(filter, many=False)
+
+    async def delete_many(self, filter) -> DeleteResult:
+        await self._database._simulate_latency()
+        return self._delete(filter, many=True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True) -> BulkWriteResult:
+        await self._database._simulate_latency()
+        result = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0, "upserted": []}
+        for request in requests:
+            if isinstance(request, InsertOne):
+                self._store(request._doc)
+                result["nInserted"] += 1
+            elif isinstance(request, (UpdateOne, UpdateMany)):
+                update = self._update(request._filter, request._doc, many=isinstance(request, UpdateMany),
+                                      array_filters=request._array_filters)
+                result["nMatched"] += update.matched_count
+                result["nModified"] += update.modified_count
+            elif isinstance(request, ReplaceOne):
+                update = self._replace(request._filter, request._doc, upsert=bool(request._upsert))
+                result["nMatched"] += update.matched_count
+                result["nModified"] += update.modified_count
+                if update.upserted_id is not None:
+                    result["nUpserted"] += 1
+                    result["upserted"].append({"index": len(result["upserted"]), "_id": update.upserted_id})
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                result["nRemoved"] += self._delete(request._filter, many=isinstance(request, DeleteMany)).deleted_count
+            else:
+                raise ValueError(f"Unsupported bulk operation: {request!r}")
+        return BulkWriteResult(result, True)
+
+    async def count_documents(self, filter) -> int:
+        await self._database._simulate_latency()
+        return sum(1 for doc in self._candidates(filter) if _matches(doc, filter))
+
+    async def estimated_document_count(self) -> int:
+        await self._database._simulate_latency()
+        return len(self._documents)
+
+    async def create_index(self, keys, name: Optional[str] = None, unique: bool = False, **kwargs) -> str:
+        await self._database._simulate_latency()
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        keys = list(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        self._indexes[name] = {"key": keys, "v": 2, **({"unique": True} if unique else {})}
+        field = keys[0][0]
+        if field != "_id" and field not in self._lookups:
+            self._lookups[field] = {}
+            for document in self._documents.values():
+                for value in _index_keys(document, field):
+                    self._lookups[field].setdefault(value, set()).add(document["_id"])
+        return name
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> MemoryCommandCursor:
+        if pipeline == [{"$indexStats": {}}]:
+            return MemoryCommandCursor(self, [
+                {"name": name, "key": dict(index["key"]),
+                 "accesses": {"ops": self._index_ops.get(name, 0), "since": self._created_at}}
+                for name, index in self._indexes.items()
+            ])
+        # $match, then optionally $group (with $sum): what the repositories send.
+        if not pipeline or "$match" not in pipeline[0] or len(pipeline) > 2 or (
+                len(pipeline) == 2 and "$group" not in pipeline[1]):
+            raise ValueError(f"Unsupported aggregation pipeline: {pipeline}")
+        query = pipeline[0]["$match"]
+        documents = [document for document in self._candidates(query) if _matches(document, query)]
+        if len(pipeline) == 2:
+            return MemoryCommandCursor(self, _group(documents, pipeline[1]["$group"]))
+        return MemoryCommandCursor(self, [copy.deepcopy(document) for document in documents])
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        await self._database._simulate_latency()
+        return copy.deepcopy(self._indexes)
+
+
+class MemoryDatabase:
+    def __init__(self, name: str = "memory", latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    async def _simulate_latency(self):
+        # Yield to the event loop like a real network round trip would.
+        await asyncio.sleep(self.latency)
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
@@ -0,0 +1,63 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Fields a keyset cursor may be ordered by; ``_id`` is always the tie-breaker.
+CURSOR_SORT_FIELDS = ["_id", "name"]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_sort(sort: Optional[str]) -> Tuple[str, int]:
+    """Turns ``name`` / ``-name`` into ``("name", 1)`` / ``("name", -1)``."""
+    sort = sort or "_id"
+    direction = -1 if sort.startswith("-") else 1
+    field = sort.lstrip("-")
+    if field not in CURSOR_SORT_FIELDS:
+        raise InvalidCursor(f"Unsupported sort field: {field}")
+    return field, direction
+
+
+def sort_spec(field: str, direction: int) -> List[Tuple[str, int]]:
+    if field == "_id":
+        return [("_id", direction)]
+    return [(field, direction), ("_id", direction)]
+
+
+def encode_cursor(field: str, direction: int, document: Dict[str, Any]) -> str:
+    payload = {"s": field, "d": direction, "id": str(document["_id"])}
+    if field != "_id":
+        payload["v"] = document.get(field)
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, field: str, direction: int) -> Dict[str, Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        last_id = ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise InvalidCursor("Malformed cursor")
+    if payload.get("s") != field or payload.get("d") != direction:
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    return {"id": last_id, "value": payload.get("v")}
+
+
+def keyset_query(query: Dict[str, Any], field: str, direction: int, cursor: Dict[str, Any]) -> Dict[str, Any]:
+    """Restricts ``query`` to documents strictly after ``cursor`` in the sort order."""
+    operator = "$gt" if direction > 0 else "$lt"
+    if field == "_id":
+        after = {"_id": {operator: cursor["id"]}}
+    else:
+        after = {"$or": [
+            {field: {operator: cursor["value"]}},
+            {field: cursor["value"], "_id": {operator: cursor["id"]}},
+        ]}
+    if not query:
+        return after
+    return {"$and": [query, after]}
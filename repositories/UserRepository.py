@@ -0,0 +1,29 @@
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+
+class UserRepository:
+    """Async data access for the ``users`` collection (Motor or ``MemoryDatabase``)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def list(self) -> List[Dict[str, Any]]:
+        return await self.collection.find().to_list(None)
+
+    async def get(self, user_id: ObjectId) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": user_id})
+
+    async def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"username": username})
+
+    async def insert(self, user_data: Dict[str, Any]) -> str:
+        result = await self.collection.insert_one(user_data)
+        return str(result.inserted_id)
+
+    async def update(self, user_id: ObjectId, user_data: Dict[str, Any]):
+        return await self.collection.update_one({"_id": user_id}, {"$set": user_data})
+
+    async def delete(self, user_id: ObjectId):
+        return await self.collection.delete_one({"_id": user_id})
@@ -0,0 +1,57 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+# An item reference is the item dict plus a readable path such as
+# "investors[2]" or "dynamicSections[0].value[1]" for error reporting.
+ItemRef = Tuple[str, Dict[str, Any]]
+
+
+def _is_url(file_name: str) -> bool:
+    return "/" in file_name
+
+
+def _walk(items: List[Any], path: str, index: Dict[str, List[ItemRef]]) -> None:
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        item_path = f"{path}[{position}]"
+        file_name = item.get("fileName")
+        if isinstance(file_name, str) and file_name and not _is_url(file_name):
+            index[file_name].append((item_path, item))
+        # Dynamic sections nest their items under "value".
+        if isinstance(item.get("value"), list):
+            _walk(item["value"], f"{item_path}.value", index)
+
+
+def index_file_names(company_data: Dict[str, Any]) -> Dict[str, List[ItemRef]]:
+    """Maps every bare ``fileName`` in the company's sections to the items that use it.
+
+    Any top-level list is treated as a section, so new section types (e.g.
+    ``transformation_plan``) are picked up without listing them here. Items that
+    already point at a stored file URL are left out.
+    """
+    index = defaultdict(list)
+    for field, value in company_data.items():
+        if isinstance(value, list):
+            _walk(value, field, index)
+    return index
+
+
+def attach_uploads(company_data: Dict[str, Any], uploads: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """Replaces each item's ``fileName`` with the URL of the upload of that name.
+
+    ``uploads`` holds ``(filename, file_url)`` pairs; when two uploads share a
+    name the first one wins, as before. Returns the uploads no item refers to and
+    the item references no upload matched.
+    """
+    index = index_file_names(company_data)
+    unmatched_files = []
+    for filename, file_url in uploads:
+        refs = index.pop(filename, None)
+        if not refs:
+            unmatched_files.append(filename)
+            continue
+        for _, item in refs:
+            item["fileName"] = file_url
+    unmatched_references = [path for refs in index.values() for path, _ in refs]
+    return {"unmatched_files": unmatched_files, "unmatched_references": unmatched_references}
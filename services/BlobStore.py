@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+
+# Content-addressed uploads are stored as "<sha256>_<first filename>"; the
+# blobs collection keeps one record per hash with a count of the company
+# documents that reference it.
+_BLOB_NAME = re.compile(r"/files/([0-9a-f]{64})_")
+
+
+def file_references(document: Any) -> Counter:
+    """Counts the content-addressed files referenced anywhere in a company document."""
+    references = Counter()
+    if isinstance(document, dict):
+        for value in document.values():
+            references.update(file_references(value))
+    elif isinstance(document, list):
+        for value in document:
+            references.update(file_references(value))
+    elif isinstance(document, str):
+        references.update(_BLOB_NAME.findall(document))
+    return references
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _last_used(blob: Dict[str, Any]) -> datetime:
+    """When a blob was stored or last deduplicated onto (records older than touched_at only have created_at)."""
+    used = blob.get("touched_at") or blob["created_at"]
+    return used if used.tzinfo else used.replace(tzinfo=timezone.utc)
+
+
+class BlobStore:
+    def __init__(self, collection, storage):
+        self.collection = collection
+        self.storage = storage
+
+    async def put(
+        self, temp_path: str, sha256: str, filename: str, content_type: Optional[str], size: int
+    ) -> Tuple[str, bool]:
+        """Hands a freshly written upload to the storage backend, or drops it if the content is already stored.
+
+        Returns the stored name of the blob holding this content and whether this call created it.
+        """
+        # A dedup hit restarts the grace period, so collect_garbage cannot delete the
+        # blob before the caller has counted the company's reference to it.
+        now = datetime.now(timezone.utc)
+        touched = await self.collection.update_one({"_id": sha256}, {"$set": {"touched_at": now}})
+        if touched.matched_count:
+            existing = await self.collection.find_one({"_id": sha256}, {"stored_name": 1})
+            if existing:
+                await run_in_threadpool(_discard, temp_path)
+                return existing["stored_name"], False
+
+        stored_name = f"{sha256}_{filename}"
+        await self.storage.put_file(temp_path, stored_name, content_type)
+        try:
+            await self.collection.insert_one({
+                "_id": sha256,
+                "stored_name": stored_name,
+                "content_type": content_type,
+                "size": size,
+                "refs": 0,
+                "created_at": now,
+                "touched_at": now,
+            })
+        except DuplicateKeyError:
+            # Same content stored concurrently under another name; keep the winner's copy.
+            existing = await self.collection.find_one({"_id": sha256})
+            if existing["stored_name"] != stored_name:
+                await self.storage.delete(stored_name)
+            return existing["stored_name"], False
+        return stored_name, True
+
+    async def discard(self, sha256: str, stored_name: str) -> None:
+        """Removes a blob created for a request that failed, unless something references it by now."""
+        result = await self.collection.delete_one({"_id": sha256, "refs": 0})
+        if result.deleted_count:
+            await self.storage.delete(stored_name)
+
+    async def _adjust(self, references: Counter, sign: int) -> None:
+        if references:
+            await self.collection.bulk_write([
+                UpdateOne({"_id": sha256}, {"$inc": {"refs": sign * count}})
+                for sha256, count in references.items()
+            ], ordered=False)
+
+    async def retain(self, document: Any) -> None:
+        """Counts the files a new company document (or a list of them) references."""
+        await self._adjust(file_references(document), 1)
+
+    async def release(self, document: Any) -> None:
+        await self._adjust(file_references(document), -1)
+
+    async def update_references(self, before: Any, after: Any) -> None:
+        old, new = file_references(before), file_references(after)
+        await self._adjust(new - old, 1)
+        await self._adjust(old - new, -1)
+
+    async def collect_garbage(self, companies_collection, grace: timedelta, dry_run: bool = False) -> Dict[str, int]:
+        """Recounts references from every company, then deletes blobs nobody references.
+
+        Blobs stored or deduplicated onto within ``grace`` are kept so uploads
+        made via /admin/upload/ have time to be attached to a company.
+        """
+        references = Counter()
+        async for company in companies_collection.find({}, {"searchKeys": 0}).batch_size(500):
+            references.update(file_references(company))
+
+        cutoff = datetime.now(timezone.utc) - grace
+        stats = {"blobs": 0, "deleted": 0, "recounted": 0}
+        async for blob in self.collection.find({}):
+            stats["blobs"] += 1
+            refs = references.get(blob["_id"], 0)
+            if refs != blob.get("refs"):
+                stats["recounted"] += 1
+                if not dry_run:
+                    # Only if the count is still the one read here: a concurrent retain or
+                    # release ($inc) wins, and the next run recounts that blob.
+                    await self.collection.update_one({"_id": blob["_id"], "refs": blob.get("refs")},
+                                                     {"$set": {"refs": refs}})
+            if refs != 0 or _last_used(blob) >= cutoff:
+                continue
+            if dry_run:
+                stats["deleted"] += 1
+                continue
+            # The record goes first, and only while it is still unreferenced and idle;
+            # the file is deleted only if this call removed the record.
+            result = await self.collection.delete_one({"_id": blob["_id"], "refs": 0, "$or": [
+                {"touched_at": {"$lt": cutoff}},
+                {"touched_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+            ]})
+            if result.deleted_count == 1:
+                stats["deleted"] += 1
+                await self.storage.delete(blob["stored_name"])
+        return stats
+
+
+async def _main():
+    from repositories.Database import get_database
+    from services.Storage import get_storage
+
+    parser = argparse.ArgumentParser(description="Delete uploaded files no company references any more.")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("--grace-hours", type=float, default=24)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = get_database()
+    blob_store = BlobStore(db["blobs"], get_storage())
+    stats = await blob_store.collect_garbage(db["companies"], timedelta(hours=args.grace_hours), args.dry_run)
+    print(f"{stats['blobs']} blobs, {stats['recounted']} recounted, "
+          f"{stats['deleted']} {'would be ' if args.dry_run else ''}deleted")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,138 @@
+import codecs
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Optional, Tuple
+
+BULK_MAX_RECORD_SIZE = int(os.getenv("BULK_MAX_RECORD_SIZE", str(1024 * 1024)))  # characters per record
+
+# Content types accepted by the bulk endpoints, by parser.
+BULK_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "json",
+}
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_DELIMITERS = frozenset(",] \t\r\n")
+
+# Each record comes with None, or an error message when it could not be parsed.
+Record = Tuple[Any, Optional[str]]
+
+
+def bulk_format(content_type: Optional[str]) -> Optional[str]:
+    return BULK_FORMATS.get((content_type or "").split(";")[0].strip().lower())
+
+
+async def _texts(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+async def ndjson_records(chunks: AsyncIterator[bytes], max_record_size: int = BULK_MAX_RECORD_SIZE) -> AsyncIterator[Record]:
+    """One record per line; a bad or oversize line is reported and the next line is read as usual."""
+    buffer, skipping = "", False
+    async for text in _texts(chunks):
+        if skipping:
+            # Rest of an oversize line that was already reported: drop it up to its newline.
+            newline = text.find("\n")
+            if newline < 0:
+                continue
+            text, skipping = text[newline + 1:], False
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line, max_record_size)
+        if len(buffer) > max_record_size:
+            yield None, f"Record exceeds {max_record_size} characters"
+            buffer, skipping = "", True
+    if buffer.strip():
+        yield _parse_line(buffer, max_record_size)
+
+
+def _parse_line(line: str, max_record_size: int) -> Record:
+    if len(line) > max_record_size:
+        return None, f"Record exceeds {max_record_size} characters"
+    try:
+        return json.loads(line), None
+    except json.JSONDecodeError as e:
+        return None, f"Invalid JSON: {e.msg}"
+
+
+async def array_records(chunks: AsyncIterator[bytes], max_record_size: int = BULK_MAX_RECORD_SIZE) -> AsyncIterator[Record]:
+    """Elements of a top-level JSON array, decoded as they arrive.
+
+    Only the element being decoded is buffered. Unlike NDJSON there is no way to
+    resynchronise after malformed JSON, so that error ends the stream.
+    """
+    texts = _texts(chunks).__aiter__()
+    buffer, position, eof = "", 0, False
+
+    async def peek() -> Optional[str]:
+        nonlocal position
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position < len(buffer):
+                return buffer[position]
+            if eof:
+                return None
+            await read_more()
+
+    async def read_more() -> None:
+        nonlocal buffer, position, eof
+        try:
+            text = await texts.__anext__()
+        except StopAsyncIteration:
+            eof = True
+            return
+        buffer, position = buffer[position:] + text, 0
+
+    if await peek() != "[":
+        yield None, "Expected a JSON array"
+        return
+    position += 1
+    if await peek() == "]":
+        return
+    while True:
+        await peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+                if end - position > max_record_size:
+                    # Arrived whole in one chunk, so the check below never saw it.
+                    yield None, f"Record exceeds {max_record_size} characters"
+                    return
+                # A number split across chunks decodes early ("12" of "123456", "-7" of
+                # "-7.25"): only take a value once a delimiter follows it.
+                if eof or (end < len(buffer) and buffer[end] in _DELIMITERS):
+                    position = end
+                    break
+            except json.JSONDecodeError as e:
+                if eof:
+                    yield None, f"Invalid JSON: {e.msg}"
+                    return
+            if len(buffer) - position > max_record_size:
+                yield None, f"Record exceeds {max_record_size} characters"
+                return
+            await read_more()
+        yield value, None
+        separator = await peek()
+        if separator == "]":
+            return
+        if separator != ",":
+            yield None, "Expected ',' or ']' between array elements"
+            return
+        position += 1
+
+
+def records(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[Record]:
+    return ndjson_records(chunks) if format == "ndjson" else array_records(chunks)
@@ -0,0 +1,27 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.responses import Response
+
+
+def company_etag(company_id: str, version: Optional[int]) -> str:
+    # Bodies are encoded deterministically, so one version has exactly one representation.
+    return f'"{company_id}-{version or 0}"'
+
+
+def list_etag(params: Dict[str, Any], rows: List[Tuple[str, Optional[int]]], headers: Dict[str, str]) -> str:
+    """Strong ETag for a list page from the parameters, the (id, version) of each row and the paging headers."""
+    digest = hashlib.sha1(json.dumps([params, rows, headers], sort_keys=True, default=str).encode())
+    return f'"l-{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,49 @@
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List
+
+from services.Serialization import dump_documents
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _public(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": str(document.pop("_id")), **document}
+
+
+async def ndjson_lines(documents: AsyncIterator[Dict[str, Any]], rows_per_chunk: int = 100) -> AsyncIterator[bytes]:
+    chunk = []
+    async for document in documents:
+        chunk.append(dump_documents(_public(document)))
+        if len(chunk) >= rows_per_chunk:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def _cell(value: Any) -> Any:
+    # Nested sections and lists do not fit in a cell; keep them as JSON.
+    if isinstance(value, (dict, list)):
+        return dump_documents(value).decode()
+    return "" if value is None else value
+
+
+async def csv_lines(
+    documents: AsyncIterator[Dict[str, Any]],
+    columns: List[str],
+    rows_per_chunk: int = 100,
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    async for document in documents:
+        company = _public(document)
+        writer.writerow([_cell(company.get(column)) for column in columns])
+        rows += 1
+        if rows % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,187 @@
+"""
+HTTP caching for /files: Cache-Control, ETag/Last-Modified with 304s, byte
+ranges (Starlette's FileResponse) and precompressed .br/.gz variants.
+
+Uploads are stored as "<sha256>_<name>", so a name always refers to the same
+bytes and can be cached forever. Anything else (the bundled no-logo.png,
+legacy files) gets a short max-age.
+"""
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+load_dotenv()
+
+FILES_CACHE_CONTROL = os.getenv("FILES_CACHE_CONTROL", "public, max-age=31536000, immutable")
+FILES_MUTABLE_CACHE_CONTROL = os.getenv("FILES_MUTABLE_CACHE_CONTROL", "public, max-age=300")
+
+# Content-Encoding -> file suffix, in order of preference.
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+VARIANT_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+
+# Worth precompressing; images and archives are already compressed.
+COMPRESSIBLE_TYPES = {"application/pdf", "application/json", "application/xml", "application/javascript",
+                      "image/svg+xml", "text/plain", "text/csv", "text/html", "text/css"}
+MIN_SAVING = 0.1  # keep a variant only when it is at least 10% smaller
+
+_HASHED_NAME = re.compile(r"^([0-9a-f]{64})_")
+
+
+def content_hash(name: str) -> Optional[str]:
+    match = _HASHED_NAME.match(os.path.basename(name))
+    return match.group(1) if match else None
+
+
+def cache_control(name: str) -> str:
+    return FILES_CACHE_CONTROL if content_hash(name) else FILES_MUTABLE_CACHE_CONTROL
+
+
+def media_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Codings the client accepts (q > 0), e.g. "gzip, br;q=0.8" -> ["gzip", "br"]."""
+    accepted = []
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if coding and not (quality.startswith("q=") and _quality(quality[2:]) == 0):
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+def _quality(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 1.0
+
+
+def file_etag(name: str, stat_result: os.stat_result, encoding: Optional[str] = None) -> str:
+    # Each encoding is a different representation, so it needs its own strong ETag.
+    base = content_hash(name) or f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+    return f'"{base}-{encoding}"' if encoding else f'"{base}"'
+
+
+def is_not_modified(request_headers: Headers, etag: str, last_modified: float) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2); weak comparison.
+        candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def select_variant(path: str, request_headers: Headers) -> Tuple[str, Optional[str], os.stat_result, bool]:
+    """Picks the precompressed variant to send, if any; blocking, run it in a thread.
+
+    Returns (path to send, Content-Encoding or None, its stat, whether variants
+    exist). Range requests always get the identity file so offsets refer to
+    the original bytes.
+    """
+    variants = [(encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)]
+    if variants and "range" not in request_headers:
+        accepted = accepted_encodings(request_headers.get("accept-encoding"))
+        for encoding, variant_path in variants:
+            if encoding in accepted:
+                return variant_path, encoding, os.stat(variant_path), True
+    return path, None, os.stat(path), bool(variants)
+
+
+def file_response(name: str, path: str, request_headers: Optional[Headers] = None) -> Response:
+    """Response for a stored file on local disk; blocking, run it in a thread."""
+    request_headers = request_headers or Headers()
+    send_path, encoding, stat_result, has_variants = select_variant(path, request_headers)
+    etag = file_etag(name, stat_result, encoding)
+    headers = {"Cache-Control": cache_control(name), "ETag": etag,
+               "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True), "Accept-Ranges": "bytes"}
+    if has_variants:
+        headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request_headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(send_path, headers=headers, media_type=media_type(name), stat_result=stat_result)
+
+
+def bytes_response(name: str, data: bytes, content_type: Optional[str], request_headers: Optional[Headers] = None) -> Response:
+    """Same cache policy for files held in memory (no ranges or variants)."""
+    etag = f'"{content_hash(name) or hashlib.sha256(data).hexdigest()}"'
+    headers = {"Cache-Control": cache_control(name), "ETag": etag}
+    if request_headers is not None and is_not_modified(request_headers, etag, 0):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=content_type or media_type(name), headers=headers)
+
+
+def precompress(path: str) -> List[str]:
+    """Writes .gz (and .br when the brotli package is installed) next to a compressible file.
+
+    Variants that do not save at least MIN_SAVING are not kept. Returns the
+    suffixes written.
+    """
+    if media_type(path) not in COMPRESSIBLE_TYPES:
+        return []
+    with open(path, "rb") as file:
+        data = file.read()
+    compressors = {".gz": lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+
+        compressors[".br"] = lambda raw: brotli.compress(raw, quality=11)
+    except ImportError:
+        pass
+    written = []
+    for suffix, compress in compressors.items():
+        variant_path = path + suffix
+        if os.path.isfile(variant_path) and os.path.getmtime(variant_path) >= os.path.getmtime(path):
+            continue
+        compressed = compress(data)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            temp_path = variant_path + ".tmp"
+            with open(temp_path, "wb") as file:
+                file.write(compressed)
+            os.replace(temp_path, variant_path)
+            written.append(suffix)
+    return written
+
+
+def _main():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from services.Storage import UPLOAD_DIR
+
+    parser = argparse.ArgumentParser(description="Write .gz/.br variants of compressible uploads for /files.")
+    parser.add_argument("command", choices=["precompress"])
+    parser.add_argument("--dir", default=UPLOAD_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    paths = [entry.path for entry in os.scandir(args.dir)
+             if entry.is_file() and not entry.name.startswith(".") and not entry.name.endswith(VARIANT_SUFFIXES)]
+    # zlib and brotli release the GIL while compressing.
+    with ThreadPoolExecutor(args.workers) as executor:
+        counts: Dict[str, int] = {}
+        for written in executor.map(precompress, paths):
+            for suffix in written:
+                counts[suffix] = counts.get(suffix, 0) + 1
+    print(f"{len(paths)} files, variants written: {counts or 'none'}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_VERIFY_CACHE_TTL = float(os.getenv("PASSWORD_VERIFY_CACHE_TTL", "60"))
+PASSWORD_VERIFY_CACHE_SIZE = 1024
+
+
+
+@lru_cache(maxsize=None)
+def password_context():
+    # passlib + bcrypt are imported on the first login, not on every (serverless) cold start.
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+# bcrypt is deliberately slow (~100-300 ms); keep it off the event loop and cap
+# how many run at once so a burst of logins cannot take every CPU.
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+class VerificationCache:
+    """Remembers successful (password, stored hash) checks for ``ttl`` seconds.
+
+    Keys are HMACs under a per-process random key, so the cache never holds
+    anything a password could be recovered or tested from. Failures are not
+    cached, so guessing still costs a full bcrypt per attempt. Changing a
+    password changes the stored hash, which retires old entries.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = secrets.token_bytes(32)
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+
+    def _digest(self, password: str, hashed_password: str) -> bytes:
+        message = hashed_password.encode() + b"\0" + password.encode()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def get(self, password: str, hashed_password: str) -> bool:
+        digest = self._digest(password, hashed_password)
+        expires_at = self._entries.get(digest)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._entries[digest]
+            return False
+        self._entries.move_to_end(digest)
+        return True
+
+    def set(self, password: str, hashed_password: str) -> None:
+        digest = self._digest(password, hashed_password)
+        self._entries[digest] = time.monotonic() + self.ttl
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+verification_cache = VerificationCache(PASSWORD_VERIFY_CACHE_TTL, PASSWORD_VERIFY_CACHE_SIZE)
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, password_context().hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    if PASSWORD_VERIFY_CACHE_TTL > 0 and verification_cache.get(password, hashed_password):
+        return True
+    verified = await asyncio.get_running_loop().run_in_executor(
+        _executor, password_context().verify, password, hashed_password
+    )
+    if verified and PASSWORD_VERIFY_CACHE_TTL > 0:
+        verification_cache.set(password, hashed_password)
+    return verified
@@ -0,0 +1,42 @@
+"""
+PDF text extraction, run inside worker processes.
+
+Kept free of app imports so spawned workers start quickly; PyPDF2 is only
+imported by the worker that needs it.
+"""
+import hashlib
+import io
+from typing import Any, Dict, Iterator, Union
+
+
+def iter_page_texts(reader) -> Iterator[str]:
+    for page in reader.pages:
+        # extract_text() returns None for pages without a text layer.
+        yield page.extract_text() or ""
+
+
+def extract_pdf(source: Union[str, bytes], max_pages: int = 0) -> Dict[str, Any]:
+    """Returns {"sha256", "pages": [text per page], "page_count", "error"} for a path or raw bytes.
+
+    Pages are extracted one at a time into a list (no repeated string
+    concatenation); ``max_pages`` > 0 stops after that many pages.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as file:
+            data = file.read()
+    else:
+        data = source
+    result = {"sha256": hashlib.sha256(data).hexdigest(), "pages": [], "page_count": 0, "error": None}
+    try:
+        import PyPDF2
+
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        result["page_count"] = len(reader.pages)
+        for number, text in enumerate(iter_page_texts(reader), start=1):
+            result["pages"].append(text)
+            if max_pages and number >= max_pages:
+                break
+    except Exception as e:
+        # Corrupt, encrypted or not really a PDF: recorded, not retried until the content changes.
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
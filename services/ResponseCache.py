@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | redis | none
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class MemoryCacheBackend:
+    """In-process LRU with a TTL per entry.
+
+    Also stands in for the shared backend in tests and single-worker runs; with
+    several workers each has its own copy, so a write only reaches the others
+    once their entries expire.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Shared cache in Redis so every worker sees invalidations at once. Requires the redis package."""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package")
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        await self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+
+class NullCacheBackend:
+    """RESPONSE_CACHE_BACKEND=none: every lookup misses."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """Cache key part for list parameters: defaults dropped, keys sorted, hashed to a fixed length."""
+    normalized = json.dumps({key: value for key, value in params.items() if value is not None},
+                            sort_keys=True, default=str)
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Encoded company and company-list responses.
+
+    Entries are keyed by a generation token that writes replace: one per
+    company, replaced when that company is written, and one for all list pages,
+    replaced by every write so all cached pages go at once without enumerating
+    them. A response read from Mongo across a write is stored under the old
+    token and never served. Tokens expire after ``generation_ttl`` (ten entry
+    TTLs by default) so ids read once do not keep one forever; a token that
+    expires only costs a miss. Hits and misses are counted per kind for
+    /admin/cache.
+    """
+
+    def __init__(self, backend, ttl: float = 30.0, prefix: str = "companies", generation_ttl: Optional[float] = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.generation_ttl = ttl * 10 if generation_ttl is None else generation_ttl
+        self.prefix = prefix
+        self.metrics = {kind: {"hits": 0, "misses": 0} for kind in ("company", "list")}
+        self.invalidations = 0
+
+    def _count(self, kind: str, value: Optional[bytes]) -> Optional[bytes]:
+        self.metrics[kind]["hits" if value is not None else "misses"] += 1
+        return value
+
+    @staticmethod
+    def _pack(body: bytes, headers: Dict[str, str]) -> bytes:
+        return json.dumps(headers).encode() + b"\n" + body
+
+    @staticmethod
+    def _unpack(value: Optional[bytes]) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        if value is None:
+            return None
+        headers, body = value.split(b"\n", 1)
+        return body, json.loads(headers)
+
+    async def _new_generation(self, key: str) -> str:
+        generation = uuid.uuid4().hex
+        await self.backend.set(key, generation.encode(), self.generation_ttl)
+        return generation
+
+    async def _generation(self, key: str, create: bool = True) -> Optional[str]:
+        generation = await self.backend.get(key)
+        if generation is None:
+            return await self._new_generation(key) if create else None
+        return generation.decode() if isinstance(generation, bytes) else generation
+
+    async def company_generation(self, company_id: str) -> Optional[str]:
+        """Read before loading the company, so a body read across a write is stored under the old generation.
+
+        None when the company has none yet: one is only created by set_company,
+        so looking up ids that do not exist writes nothing.
+        """
+        return await self._generation(f"{self.prefix}:company-generation:{company_id}", create=False)
+
+    async def get_company(self, generation: Optional[str], company_id: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        if generation is None:
+            return self._count("company", None)
+        key = f"{self.prefix}:company:{company_id}:{generation}"
+        return self._unpack(self._count("company", await self.backend.get(key)))
+
+    async def set_company(self, generation: Optional[str], company_id: str, body: bytes,
+                          headers: Dict[str, str]) -> None:
+        if generation is None:
+            # The body was read before any generation existed, so a write may already have
+            # replaced it: start a generation for the next read instead of storing it.
+            await self._new_generation(f"{self.prefix}:company-generation:{company_id}")
+            return
+        await self.backend.set(f"{self.prefix}:company:{company_id}:{generation}", self._pack(body, headers), self.ttl)
+
+    async def list_generation(self) -> str:
+        """Read before querying Mongo, so a page fetched across a write is stored under the old generation."""
+        return await self._generation(f"{self.prefix}:list-generation")
+
+    async def get_list(self, generation: str, params: Dict[str, Any]) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        key = f"{self.prefix}:list:{generation}:{normalize_params(params)}"
+        return self._unpack(self._count("list", await self.backend.get(key)))
+
+    async def set_list(self, generation: str, params: Dict[str, Any], body: bytes, headers: Dict[str, str]) -> None:
+        key = f"{self.prefix}:list:{generation}:{normalize_params(params)}"
+        await self.backend.set(key, self._pack(body, headers), self.ttl)
+
+    async def invalidate(self, *company_ids: str) -> None:
+        """Call after companies are created, updated or deleted, with the ids of existing ones written."""
+        self.invalidations += 1
+        for company_id in company_ids:
+            await self._new_generation(f"{self.prefix}:company-generation:{company_id}")
+        await self._new_generation(f"{self.prefix}:list-generation")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"backend": type(self.backend).__name__, "ttl": self.ttl, "invalidations": self.invalidations}
+        for kind, counts in self.metrics.items():
+            total = counts["hits"] + counts["misses"]
+            stats[kind] = {**counts, "hit_ratio": round(counts["hits"] / total, 3) if total else None}
+        if isinstance(self.backend, MemoryCacheBackend):
+            stats["entries"] = len(self.backend)
+        return stats
+
+
+def get_response_cache(backend: str = None) -> ResponseCache:
+    backend = backend or RESPONSE_CACHE_BACKEND
+    if backend == "none":
+        return ResponseCache(NullCacheBackend(), RESPONSE_CACHE_TTL)
+    if backend == "memory":
+        return ResponseCache(MemoryCacheBackend(RESPONSE_CACHE_MAX_ENTRIES), RESPONSE_CACHE_TTL)
+    if backend == "redis":
+        return ResponseCache(RedisCacheBackend(REDIS_URL), RESPONSE_CACHE_TTL)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
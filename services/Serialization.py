@@ -0,0 +1,30 @@
+from functools import lru_cache
+from typing import Any, List
+
+from bson import Decimal128, ObjectId
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+def _bson_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_documents(documents: Any) -> bytes:
+    """Encodes documents read from Mongo straight to JSON bytes, without model validation."""
+    return to_json(documents, fallback=_bson_default)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_validated(model, documents: List[dict]) -> bytes:
+    """Strict path: validates every document against ``model`` before encoding."""
+    adapter = _list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(documents))
@@ -0,0 +1,278 @@
+import os
+import tempfile
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import RedirectResponse, Response
+
+from services.FileServing import VARIANT_SUFFIXES, bytes_response, cache_control, file_response
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")  # local | s3 | memory
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. a MinIO server
+S3_REGION = os.getenv("S3_REGION")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL")  # public bucket/CDN base; presigned URLs are used when unset
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "3600"))
+
+
+class StorageBackend:
+    """Where uploaded files live once the upload pipeline has written them to a local temp file.
+
+    ``incoming_dir`` is where uploads are staged; ``put_file`` takes ownership of
+    the staged file. ``response`` answers GET /files/{name}, ideally without the
+    app streaming the bytes itself; ``request_headers`` carries the conditional,
+    range and Accept-Encoding headers.
+    """
+
+    incoming_dir: str
+
+    async def put_file(self, local_path: str, name: str, content_type: Optional[str]) -> None:
+        raise NotImplementedError
+
+    async def delete(self, name: str) -> None:
+        raise NotImplementedError
+
+    async def exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    async def response(self, name: str, request_headers: Optional[Headers] = None) -> Response:
+        raise NotImplementedError
+
+    async def read(self, name: str) -> Optional[bytes]:
+        """Whole file contents, or None if missing; for background processing, not for serving."""
+        raise NotImplementedError
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Path of the file on this machine when the backend keeps files on disk."""
+        return None
+
+    async def fingerprint(self, name: str) -> Optional[str]:
+        """Cheap token that changes whenever the stored bytes do (no read), or None if missing."""
+        raise NotImplementedError
+
+    async def list_names(self) -> List[str]:
+        raise NotImplementedError
+
+
+def _safe_name(name: str) -> Optional[str]:
+    name = name.replace("\\", "/")
+    if not name or name.startswith("/") or any(part in ("", ".", "..") for part in name.split("/")):
+        return None
+    return name
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+        # Staged next to the final location so put_file is an atomic rename.
+        self.incoming_dir = os.path.join(root, ".incoming")
+
+    def _path(self, name: str) -> Optional[str]:
+        name = _safe_name(name)
+        return os.path.join(self.root, name) if name else None
+
+    async def put_file(self, local_path: str, name: str, content_type: Optional[str]) -> None:
+        await run_in_threadpool(os.makedirs, self.root, exist_ok=True)
+        await run_in_threadpool(os.replace, local_path, self._path(name))
+
+    async def delete(self, name: str) -> None:
+        path = self._path(name)
+        if path:
+            for variant in (path,) + tuple(path + suffix for suffix in VARIANT_SUFFIXES):
+                await run_in_threadpool(_remove, variant)
+
+    async def exists(self, name: str) -> bool:
+        path = self._path(name)
+        return bool(path) and await run_in_threadpool(os.path.isfile, path)
+
+    async def response(self, name: str, request_headers: Optional[Headers] = None) -> Response:
+        path = self._path(name)
+        if not path or not await run_in_threadpool(os.path.isfile, path):
+            return Response(status_code=404)
+        return await run_in_threadpool(file_response, name, path, request_headers)
+
+    async def read(self, name: str) -> Optional[bytes]:
+        path = self._path(name)
+        if not path or not await run_in_threadpool(os.path.isfile, path):
+            return None
+
+        def read_file():
+            with open(path, "rb") as file:
+                return file.read()
+
+        return await run_in_threadpool(read_file)
+
+    def local_path(self, name: str) -> Optional[str]:
+        path = self._path(name)
+        return path if path and os.path.isfile(path) else None
+
+    async def fingerprint(self, name: str) -> Optional[str]:
+        path = self._path(name)
+        if not path:
+            return None
+        try:
+            stat_result = await run_in_threadpool(os.stat, path)
+        except FileNotFoundError:
+            return None
+        return f"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+
+    async def list_names(self) -> List[str]:
+        def list_files():
+            if not os.path.isdir(self.root):
+                return []
+            # Dotfiles are staging areas; .br/.gz files are precompressed variants, not uploads.
+            return [name for name in os.listdir(self.root)
+                    if not name.startswith(".") and not name.endswith(VARIANT_SUFFIXES)
+                    and os.path.isfile(os.path.join(self.root, name))]
+
+        return await run_in_threadpool(list_files)
+
+
+class MemoryStorage(StorageBackend):
+    """Keeps files in a dict; for tests and throwaway local runs."""
+
+    def __init__(self):
+        self.incoming_dir = os.path.join(tempfile.gettempdir(), "uploads-incoming")
+        self.files: Dict[str, Tuple[bytes, Optional[str]]] = {}
+        self.fingerprints: Dict[str, str] = {}
+
+    async def put_file(self, local_path: str, name: str, content_type: Optional[str]) -> None:
+        def read_and_remove():
+            with open(local_path, "rb") as staged:
+                data = staged.read()
+            os.remove(local_path)
+            return data
+
+        self.files[name] = (await run_in_threadpool(read_and_remove), content_type)
+        self.fingerprints[name] = uuid.uuid4().hex
+
+    async def delete(self, name: str) -> None:
+        self.files.pop(name, None)
+        self.fingerprints.pop(name, None)
+
+    async def exists(self, name: str) -> bool:
+        return name in self.files
+
+    async def response(self, name: str, request_headers: Optional[Headers] = None) -> Response:
+        if name not in self.files:
+            return Response(status_code=404)
+        data, content_type = self.files[name]
+        return bytes_response(name, data, content_type, request_headers)
+
+    async def read(self, name: str) -> Optional[bytes]:
+        return self.files[name][0] if name in self.files else None
+
+    async def fingerprint(self, name: str) -> Optional[str]:
+        return self.fingerprints.get(name)
+
+    async def list_names(self) -> List[str]:
+        return list(self.files)
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage (AWS S3, MinIO, R2...). Requires boto3.
+
+    Files are never streamed through the app: /files/{name} redirects to
+    S3_PUBLIC_URL when the bucket is public, otherwise to a presigned URL.
+    """
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 public_url: Optional[str] = None, presign_expires: int = 3600, client=None):
+        self._client = client
+        self._client_options = {"endpoint_url": endpoint_url, "region_name": region,
+                                "aws_access_key_id": access_key_id, "aws_secret_access_key": secret_access_key}
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.presign_expires = presign_expires
+        self.incoming_dir = os.path.join(tempfile.gettempdir(), "uploads-incoming")
+
+    @property
+    def client(self):
+        # boto3 takes a few hundred ms to import and build a client; pay that on first use, not at startup.
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+            self._client = boto3.client("s3", **self._client_options)
+        return self._client
+
+    async def put_file(self, local_path: str, name: str, content_type: Optional[str]) -> None:
+        # The bucket (or CDN in front of it) serves the file, so it carries the cache policy.
+        extra_args = {"CacheControl": cache_control(name)}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        try:
+            await run_in_threadpool(self.client.upload_file, local_path, self.bucket, name, ExtraArgs=extra_args)
+        finally:
+            await run_in_threadpool(_remove, local_path)
+
+    async def delete(self, name: str) -> None:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=name)
+
+    async def exists(self, name: str) -> bool:
+        return await self.fingerprint(name) is not None
+
+    async def fingerprint(self, name: str) -> Optional[str]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=name)
+        except ClientError:
+            return None
+        return head["ETag"].strip('"')
+
+    def url(self, name: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{name}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": name}, ExpiresIn=self.presign_expires)
+
+    async def response(self, name: str, request_headers: Optional[Headers] = None) -> Response:
+        if not _safe_name(name):
+            return Response(status_code=404)
+        return RedirectResponse(self.url(name), status_code=307)
+
+    async def read(self, name: str) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = await run_in_threadpool(self.client.get_object, Bucket=self.bucket, Key=name)
+        except ClientError:
+            return None
+        return await run_in_threadpool(response["Body"].read)
+
+    async def list_names(self) -> List[str]:
+        def list_keys():
+            paginator = self.client.get_paginator("list_objects_v2")
+            return [item["Key"] for page in paginator.paginate(Bucket=self.bucket) for item in page.get("Contents", [])]
+
+        return await run_in_threadpool(list_keys)
+
+
+def get_storage(backend: str = None) -> StorageBackend:
+    backend = backend or STORAGE_BACKEND
+    if backend == "local":
+        return LocalStorage(UPLOAD_DIR)
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "s3":
+        return S3Storage(S3_BUCKET, S3_ENDPOINT_URL, S3_REGION, S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY,
+                         S3_PUBLIC_URL, S3_PRESIGN_EXPIRES)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
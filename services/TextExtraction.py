@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+
+from repositories.AttachmentSearch import index_pages
+from services.BlobStore import file_references
+from services.PdfText import extract_pdf
+
+load_dotenv()
+
+# 0 extracts in a thread instead of worker processes (serverless runtimes without /dev/shm).
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+
+# "/files/<name>.pdf" for uploads that predate content addressing (those have blob
+# records instead). Names may contain spaces, so match up to a quote, query, fragment
+# or the end of the value.
+_LEGACY_PDF_NAME = re.compile(r"/files/(?![0-9a-f]{64}_)([^/?#\"]+?\.pdf)(?=[\"?#]|$)", re.IGNORECASE)
+
+
+def legacy_pdf_references(document: Any) -> Set[str]:
+    """Stored names of the PDFs a company document links to that have no blob record."""
+    names = set()
+    if isinstance(document, dict):
+        for value in document.values():
+            names |= legacy_pdf_references(value)
+    elif isinstance(document, list):
+        for value in document:
+            names |= legacy_pdf_references(value)
+    elif isinstance(document, str):
+        names.update(_LEGACY_PDF_NAME.findall(document))
+    return names
+
+
+class TextExtractor:
+    """Extracts the text of uploaded PDFs in a process pool, off the request path.
+
+    ``attachment_texts`` caches one record per content hash (page count, error)
+    with the stored names that hold that content, so a file is only parsed once
+    however often it is uploaded; the page text itself is kept only in the
+    ``attachment_pages`` search index, one document per page, so a long PDF
+    never has to fit in a single document. ``company_texts`` sits
+    next to each company (same ``_id``) and lists the extracted PDFs it references.
+    """
+
+    def __init__(self, db, storage, workers: int = PDF_EXTRACT_WORKERS, max_pages: int = PDF_MAX_PAGES):
+        self.companies = db["companies"]
+        self.texts = db["attachment_texts"]
+        self.company_texts = db["company_texts"]
+        self.pages = db["attachment_pages"]
+        self.blobs = db["blobs"]
+        self.storage = storage
+        self.workers = workers
+        self.max_pages = max_pages
+        self._executor = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _pool(self):
+        if self._executor is None:
+            # Imported here: multiprocessing is only needed once a PDF actually arrives.
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn, not fork: the parent has a running event loop and Mongo client threads.
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _remember_name(self, sha256: str, stored_name: str) -> None:
+        await self.texts.update_one({"_id": sha256, "stored_names": {"$ne": stored_name}},
+                                    {"$push": {"stored_names": stored_name}})
+
+    async def extract(self, stored_name: str, sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Text record (without pages) for a stored PDF, extracting it only if its content is new."""
+        cached = await self.texts.find_one({"_id": sha256} if sha256 else {"stored_names": stored_name}, {"pages": 0})
+        if cached:
+            if stored_name not in cached["stored_names"]:
+                await self._remember_name(cached["_id"], stored_name)
+            return cached
+        # Concurrent requests for the same file share one extraction.
+        if stored_name not in self._in_flight:
+            self._in_flight[stored_name] = asyncio.ensure_future(self._extract(stored_name))
+            self._in_flight[stored_name].add_done_callback(lambda _: self._in_flight.pop(stored_name, None))
+        return await asyncio.shield(self._in_flight[stored_name])
+
+    async def _extract(self, stored_name: str) -> Optional[Dict[str, Any]]:
+        source = self.storage.local_path(stored_name) or await self.storage.read(stored_name)
+        if source is None:
+            return None
+        if self.workers > 0:
+            result = await asyncio.get_running_loop().run_in_executor(self._pool(), extract_pdf, source, self.max_pages)
+        else:
+            result = await run_in_threadpool(extract_pdf, source, self.max_pages)
+        record = {
+            "_id": result["sha256"],
+            "stored_names": [stored_name],
+            "page_count": result["page_count"],
+            "error": result["error"],
+            "extracted_at": datetime.now(timezone.utc),
+            "indexed": True,
+        }
+        # Pages first: a record marked indexed always has its pages searchable.
+        await index_pages(self.pages, record["_id"], result["pages"])
+        try:
+            await self.texts.insert_one(record)
+        except DuplicateKeyError:
+            # Same content already extracted under another name.
+            await self._remember_name(record["_id"], stored_name)
+        return record
+
+    async def pdf_references(self, company: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
+        """(stored name, sha256) of the PDFs a company references, sorted by name.
+
+        Content-addressed uploads are resolved through the blob records the
+        upload path wrote (the same references BlobStore counts), so the stored
+        name and content type come from there rather than from the URL text.
+        """
+        pdfs: Dict[str, Optional[str]] = {}
+        hashes = list(file_references(company))
+        if hashes:
+            async for blob in self.blobs.find({"_id": {"$in": hashes}}, {"stored_name": 1, "content_type": 1}):
+                if is_pdf(blob["stored_name"], blob.get("content_type")):
+                    pdfs[blob["stored_name"]] = blob["_id"]
+        for name in legacy_pdf_references(company):
+            pdfs.setdefault(name, None)
+        return sorted(pdfs.items())
+
+    async def index_company(self, company_id: ObjectId) -> None:
+        """Extracts every PDF the company references and records them in company_texts."""
+        try:
+            company = await self.companies.find_one({"_id": company_id}, {"searchKeys": 0})
+            if company is None:
+                await self.company_texts.delete_one({"_id": company_id})
+                return
+            pdfs = await self.pdf_references(company)
+            records = await asyncio.gather(*(self.extract(name, sha256) for name, sha256 in pdfs))
+            files = [
+                {"stored_name": name, "sha256": record["_id"], "page_count": record["page_count"], "error": record["error"]}
+                for (name, _), record in zip(pdfs, records) if record
+            ]
+            await self.company_texts.replace_one(
+                {"_id": company_id},
+                {"_id": company_id, "files": files, "updatedAt": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"Error extracting attachment text for company {company_id}: {e}")
+
+    async def index_companies(self, company_ids: List[ObjectId]) -> None:
+        for company_id in company_ids:
+            await self.index_company(company_id)
+
+    async def extract_upload(self, stored_name: str, sha256: str) -> None:
+        """Warms the cache for a file uploaded before it is attached to a company."""
+        try:
+            await self.extract(stored_name, sha256)
+        except Exception as e:
+            print(f"Error extracting text from {stored_name}: {e}")
+
+    async def remove_company(self, company_id: ObjectId) -> None:
+        await self.company_texts.delete_one({"_id": company_id})
+
+    async def backfill(self, concurrency: int) -> Dict[str, int]:
+        """Extracts every PDF in storage, then re-links every company that references files."""
+        names = [name for name in await self.storage.list_names() if name.lower().endswith(".pdf")]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(name: str):
+            async with semaphore:
+                return await self.extract(name)
+
+        records = await asyncio.gather(*(bounded(name) for name in names))
+        stats = {"files": len(names), "failed": sum(1 for record in records if record and record["error"]), "companies": 0}
+        async for company in self.companies.find({}, {"_id": 1}):
+            await self.index_company(company["_id"])
+            stats["companies"] += 1
+        return stats
+
+
+def is_pdf(stored_name: str, content_type: Optional[str]) -> bool:
+    return content_type == "application/pdf" or stored_name.lower().endswith(".pdf")
+
+
+async def _main():
+    from repositories.Database import get_database
+    from repositories.Indexes import ensure_indexes
+    from services.Storage import get_storage
+
+    parser = argparse.ArgumentParser(description="Extract text from every uploaded PDF and link it to companies.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or PDF_EXTRACT_WORKERS)
+    args = parser.parse_args()
+
+    db = get_database()
+    await ensure_indexes(db)
+    extractor = TextExtractor(db, get_storage(), workers=args.workers)
+    try:
+        stats = await extractor.backfill(concurrency=args.workers * 2)
+    finally:
+        extractor.shutdown()
+    print(f"{stats['files']} PDFs ({stats['failed']} unreadable), {stats['companies']} companies linked")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
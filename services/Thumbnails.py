@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+from services.FileServing import cache_control, is_not_modified
+
+load_dotenv()
+
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", "thumbnail_cache")
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+THUMBNAIL_MAX_DIMENSION = int(os.getenv("THUMBNAIL_MAX_DIMENSION", "2048"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+# Widths/heights actually rendered: a request is rounded up to the next one, so each
+# source has a handful of variants rather than one per pixel size asked for.
+THUMBNAIL_SIZES = sorted({min(int(size), THUMBNAIL_MAX_DIMENSION)
+                          for size in os.getenv("THUMBNAIL_SIZES", "32,64,128,256,512,1024,2048").split(",")})
+# Sources with more pixels than this are refused before they are decoded.
+THUMBNAIL_MAX_SOURCE_PIXELS = int(os.getenv("THUMBNAIL_MAX_SOURCE_PIXELS", str(40_000_000)))
+
+# Output formats: Pillow format name, response content type and cache file suffix.
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+    "jpg": ("JPEG", "image/jpeg", ".jpg"),
+    "png": ("PNG", "image/png", ".png"),
+}
+_MEDIA_TYPES = {suffix: media_type for _, media_type, suffix in THUMBNAIL_FORMATS.values()}
+
+# Stored names are "<sha256>_<original name>", so the source hash is usually free.
+_HASHED_NAME = re.compile(r"^([0-9a-f]{64})_")
+
+# Resizing is CPU bound; a small pool keeps a page of new logos from taking every core.
+_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+
+
+class NotAnImage(ValueError):
+    pass
+
+
+def default_format(name: str) -> str:
+    # PNG logos usually rely on transparency; everything else becomes JPEG.
+    return "png" if name.lower().endswith(".png") else "jpeg"
+
+
+def thumbnail_size(value: Optional[int]) -> Optional[int]:
+    """Rounds a requested width or height up to the next THUMBNAIL_SIZES entry (the largest at most)."""
+    if value is None:
+        return None
+    return next((size for size in THUMBNAIL_SIZES if size >= value), THUMBNAIL_SIZES[-1])
+
+
+def render_thumbnail(data: bytes, width: Optional[int], height: Optional[int], format: str) -> bytes:
+    """Fits the image inside width x height (never upscaling) and re-encodes it as format."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError("Thumbnails need Pillow: pip install Pillow")
+
+    box = (width or THUMBNAIL_MAX_DIMENSION, height or THUMBNAIL_MAX_DIMENSION)
+    Image.MAX_IMAGE_PIXELS = THUMBNAIL_MAX_SOURCE_PIXELS
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Only the header has been read so far: refuse huge sources before decoding them.
+        if image.width * image.height > THUMBNAIL_MAX_SOURCE_PIXELS:
+            raise NotAnImage(f"Image is larger than {THUMBNAIL_MAX_SOURCE_PIXELS} pixels")
+        # JPEGs can be decoded at 1/2..1/8 scale; keep twice the target size (square, so an
+        # EXIF rotation cannot make it too small) for LANCZOS to work from.
+        scale = min(box[0] / image.width, box[1] / image.height, 1)
+        side = 2 * max(round(image.width * scale), round(image.height * scale), 1)
+        image.draft(None, (side, side))
+        image.load()
+    except (Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise NotAnImage(str(e) or "Unreadable image")
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(box, Image.LANCZOS)
+
+    pil_format = THUMBNAIL_FORMATS[format][0]
+    if pil_format == "JPEG" and image.mode != "RGB":
+        # JPEG has no alpha: flatten onto white so transparent logos do not turn black.
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    elif image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+        image = image.convert("RGBA")
+
+    output = io.BytesIO()
+    options = {"optimize": True} if pil_format == "PNG" else {"quality": THUMBNAIL_QUALITY}
+    image.save(output, pil_format, **options)
+    return output.getvalue()
+
+
+class ThumbnailCache:
+    """Resized variants of stored images, generated on first request and kept on local disk.
+
+    Requested sizes are rounded up to THUMBNAIL_SIZES. A variant is keyed by
+    the source content hash (or, for names that are not content-addressed, the
+    name and storage fingerprint) and the parameters, so a replaced logo never
+    serves a stale thumbnail, and variants get the same Cache-Control as their
+    source. Hits are plain FileResponses. Each hit bumps the file's atime
+    (mtime, and so Last-Modified, stays put) and, once the cache grows past
+    ``max_bytes``, the least recently used variants are deleted down to 90% of
+    it. When the cache directory cannot be written (a read-only filesystem),
+    variants are rendered and served uncached.
+    """
+
+    def __init__(self, storage, cache_dir: str = THUMBNAIL_CACHE_DIR, max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES):
+        self.storage = storage
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._eviction: Optional[asyncio.Future] = None
+
+    def _path(self, source_key: str, width: Optional[int], height: Optional[int], format: str) -> str:
+        key = hashlib.sha256(f"{source_key}:{width}:{height}:{format}:{THUMBNAIL_QUALITY}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + THUMBNAIL_FORMATS[format][2])
+
+    async def response(self, name: str, width: Optional[int], height: Optional[int], format: Optional[str],
+                       request_headers: Optional[Headers] = None) -> Response:
+        if format is not None and format not in THUMBNAIL_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(THUMBNAIL_FORMATS)}")
+        format = "jpeg" if format == "jpg" else format or default_format(name)
+        width, height = thumbnail_size(width), thumbnail_size(height)
+        media_type = THUMBNAIL_FORMATS[format][1]
+        match = _HASHED_NAME.match(name)
+        if match:
+            source_key = match.group(1)
+        else:
+            # Not content-addressed: key on the name and the storage fingerprint (size and
+            # mtime, or the object ETag), so a hit never has to read the source.
+            fingerprint = await self.storage.fingerprint(name)
+            if fingerprint is None:
+                return Response(status_code=404)
+            source_key = f"{name}:{fingerprint}"
+
+        path = self._path(source_key, width, height, format)
+        headers = {"Cache-Control": cache_control(name), "ETag": f'"{os.path.basename(path).split(".")[0]}"'}
+        stat_result = await run_in_threadpool(_touch, path)
+        if stat_result:
+            if is_not_modified(request_headers or Headers(), headers["ETag"], stat_result.st_mtime):
+                return Response(status_code=304, headers=headers)
+            return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+        # Concurrent requests for the same variant share one render.
+        if path not in self._in_flight:
+            self._in_flight[path] = asyncio.ensure_future(self._render(name, path, width, height, format))
+            self._in_flight[path].add_done_callback(lambda _: self._in_flight.pop(path, None))
+        try:
+            thumbnail = await asyncio.shield(self._in_flight[path])
+        except NotAnImage as e:
+            raise HTTPException(status_code=400, detail=f"File is not an image that can be resized: {e}")
+        except RuntimeError as e:
+            # Pillow is optional: without it, serve the original rather than a broken image.
+            print(f"Error rendering thumbnail for {name}: {e}")
+            return await self.storage.response(name, request_headers)
+        if thumbnail is None:
+            return Response(status_code=404)
+        # Already in memory: no need to re-read (or race eviction for) the file just written.
+        return Response(content=thumbnail, media_type=media_type, headers=headers)
+
+    async def _render(self, name: str, path: str,
+                      width: Optional[int], height: Optional[int], format: str) -> Optional[bytes]:
+        data = await self.storage.read(name)
+        if data is None:
+            return None
+        loop = asyncio.get_running_loop()
+        thumbnail = await loop.run_in_executor(_executor, render_thumbnail, data, width, height, format)
+        try:
+            await run_in_threadpool(_write, path, thumbnail)
+        except OSError as e:
+            print(f"Error caching thumbnail {path}: {e}")
+            return thumbnail
+
+        if self._size is None:
+            self._size = await run_in_threadpool(_cache_size, self.cache_dir)
+        else:
+            self._size += len(thumbnail)
+        if self._size > self.max_bytes and (self._eviction is None or self._eviction.done()):
+            self._eviction = asyncio.ensure_future(self._evict())
+        return thumbnail
+
+    async def _evict(self) -> None:
+        try:
+            self._size = await run_in_threadpool(_evict_lru, self.cache_dir, int(self.max_bytes * 0.9))
+        except Exception as e:
+            print(f"Error evicting thumbnails: {e}")
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {"bytes": self._size, "max_bytes": self.max_bytes, "rendering": len(self._in_flight)}
+
+
+def _touch(path: str) -> Optional[os.stat_result]:
+    """Marks a cached variant as just used (atime drives eviction); None when it is not cached."""
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    try:
+        # Set explicitly: relatime/noatime mounts do not update atime on reads.
+        os.utime(path, (time.time(), stat_result.st_mtime))
+    except OSError:
+        pass  # read-only cache: still serve it, it just ages out by its old atime
+    return stat_result
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _variants(cache_dir: str):
+    if not os.path.isdir(cache_dir):
+        return
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir():
+            for file in os.scandir(entry.path):
+                if file.is_file() and os.path.splitext(file.name)[1] in _MEDIA_TYPES and not file.name.startswith("."):
+                    yield file
+
+
+def _cache_size(cache_dir: str) -> int:
+    return sum(file.stat().st_size for file in _variants(cache_dir))
+
+
+def _evict_lru(cache_dir: str, target_bytes: int, min_age: float = 60.0) -> int:
+    """Deletes least recently served variants until the cache is under target_bytes; returns the new size.
+
+    Variants used in the last ``min_age`` seconds are kept, so a response that
+    is about to be served from disk is never deleted under it.
+    """
+    files = sorted(((file.stat().st_atime, file.stat().st_size, file.path) for file in _variants(cache_dir)))
+    total = sum(size for _, size, _ in files)
+    cutoff = time.time() - min_age
+    for used, size, path in files:
+        if total <= target_bytes or used > cutoff:
+            break
+        _remove(path)
+        total -= size
+    return total
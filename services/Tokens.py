@@ -0,0 +1,103 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", "3600"))
+AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET")
+# Development only: sign with a random per-process key. Tokens then fail on every other
+# worker or serverless instance and after each restart, so it is never used with SERVERLESS.
+AUTH_EPHEMERAL_SECRET = os.getenv("AUTH_EPHEMERAL_SECRET", "false").lower() in ("1", "true", "yes")
+if not AUTH_TOKEN_SECRET:
+    if not AUTH_EPHEMERAL_SECRET or os.getenv("SERVERLESS", "false").lower() in ("1", "true", "yes"):
+        raise RuntimeError(
+            "AUTH_TOKEN_SECRET is not set. Set the same value on every worker, e.g. from "
+            "python -c 'import secrets; print(secrets.token_urlsafe(32))'"
+        )
+    print("AUTH_TOKEN_SECRET is not set; tokens will only be valid in this process until it restarts")
+    AUTH_TOKEN_SECRET = secrets.token_urlsafe(32)
+
+_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(signing_input: str, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest())
+
+
+def issue_token(subject: str, username: str, role: str, ttl: int = AUTH_TOKEN_TTL,
+                secret: str = AUTH_TOKEN_SECRET) -> Dict[str, Any]:
+    """Signs an HS256 JWT for a logged-in user; returns the token and its claims."""
+    now = int(time.time())
+    claims = {"sub": subject, "username": username, "role": role, "iat": now, "exp": now + ttl,
+              "jti": uuid.uuid4().hex}
+    signing_input = ".".join(_b64encode(json.dumps(part, separators=(",", ":")).encode())
+                             for part in (_HEADER, claims))
+    return {"token": f"{signing_input}.{_sign(signing_input, secret)}", "claims": claims}
+
+
+def decode_token(token: str, secret: str = AUTH_TOKEN_SECRET) -> Dict[str, Any]:
+    """Checks signature and expiry without any I/O and returns the claims."""
+    try:
+        header, payload, signature = token.split(".")
+        header_data = json.loads(_b64decode(header))
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        raise InvalidToken("Malformed token")
+    if header_data != _HEADER or not isinstance(claims, dict):
+        raise InvalidToken("Unsupported token")
+    if not hmac.compare_digest(signature.encode(), _sign(f"{header}.{payload}", secret).encode()):
+        raise InvalidToken("Invalid token signature")
+    if claims.get("exp", 0) < time.time():
+        raise InvalidToken("Token has expired")
+    return claims
+
+
+class TokenDenylist:
+    """Token ids revoked before they expire (logout).
+
+    Entries only need to outlive the token, so each is dropped after its
+    ``exp``. Kept per process; with several workers, pair short token TTLs
+    with this or move it to a shared store.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+
+    def revoke(self, claims: Dict[str, Any]) -> None:
+        self._prune()
+        self._revoked[claims["jti"]] = claims["exp"]
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti in self._revoked
+
+    def _prune(self) -> None:
+        now = time.time()
+        for jti in [jti for jti, expires_at in self._revoked.items() if expires_at < now]:
+            del self._revoked[jti]
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+token_denylist = TokenDenylist()
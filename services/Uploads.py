@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+ALLOWED_FILE_TYPES = ["image/jpeg", "image/png", "application/pdf"]
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))  # files stored in parallel per request
+# Whole multipart request body: the company forms carry a logo and several attachments.
+MAX_MULTIPART_SIZE = int(os.getenv("MAX_MULTIPART_SIZE", str(4 * MAX_UPLOAD_SIZE + 1024 * 1024)))
+MULTIPART_OVERHEAD = 64 * 1024  # boundary, part headers and form fields around a single file
+
+
+class StoredFile(BaseModel):
+    filename: str  # name the client sent
+    stored_name: str  # "<sha256>_<filename>" in storage and under /files
+    file_url: str
+    file_type: Optional[str] = None
+    size: int
+    sha256: str
+    created: bool = False  # False when the content was already stored
+
+
+def build_file_url(stored_name: str) -> str:
+    base_url = os.getenv("API_BASE_URL")
+    if base_url:
+        return f"{base_url}/files/{stored_name}"
+    return f"/files/{stored_name}"
+
+
+def check_file_type(file: UploadFile, allowed_types: Optional[List[str]] = ALLOWED_FILE_TYPES) -> None:
+    if allowed_types is not None and file.content_type not in allowed_types:
+        raise HTTPException(status_code=400, detail=f"Invalid file type for {file.filename}")
+
+
+def _write_chunk(buffer, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(
+    file: UploadFile,
+    blob_store,
+    allowed_types: Optional[List[str]] = ALLOWED_FILE_TYPES,
+    max_size: int = MAX_UPLOAD_SIZE,
+) -> StoredFile:
+    """Copies an upload in fixed-size chunks, off the event loop, into the content-addressed store.
+
+    The size limit is enforced while copying and the SHA-256 is computed on the
+    way through, so memory use stays at one chunk whatever the file size. If the
+    same content was stored before, the existing file is returned instead.
+    """
+    check_file_type(file, allowed_types)
+    filename = os.path.basename(file.filename or "file")
+    incoming_dir = blob_store.storage.incoming_dir
+    path = os.path.join(incoming_dir, str(uuid.uuid4()))
+    await run_in_threadpool(os.makedirs, incoming_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    buffer = await run_in_threadpool(open, path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=413, detail=f"{filename} exceeds the {max_size} byte upload limit")
+            await run_in_threadpool(_write_chunk, buffer, digest, chunk)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(_discard, path)
+        raise
+    await run_in_threadpool(buffer.close)
+
+    sha256 = digest.hexdigest()
+    put = asyncio.ensure_future(blob_store.put(path, sha256, filename, file.content_type, size))
+    try:
+        stored_name, created = await asyncio.shield(put)
+    except asyncio.CancelledError:
+        # Let the put finish so the file and its blob record stay consistent, then undo it.
+        stored_name, created = await put
+        if created:
+            await blob_store.discard(sha256, stored_name)
+        raise
+    return StoredFile(
+        filename=filename,
+        stored_name=stored_name,
+        file_url=build_file_url(stored_name),
+        file_type=file.content_type,
+        size=size,
+        sha256=sha256,
+        created=created,
+    )
+
+
+async def save_uploads(
+    files: List[UploadFile],
+    blob_store,
+    allowed_types: Optional[List[str]] = ALLOWED_FILE_TYPES,
+    max_size: int = MAX_UPLOAD_SIZE,
+    concurrency: int = UPLOAD_CONCURRENCY,
+) -> List[StoredFile]:
+    """Stores several uploads concurrently, at most ``concurrency`` at a time, in the order given.
+
+    Every file type is checked before anything is written. If one upload fails the
+    others are cancelled and the blobs this call created are removed again.
+    """
+    for file in files:
+        check_file_type(file, allowed_types)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(file: UploadFile) -> StoredFile:
+        async with semaphore:
+            return await save_upload(file, blob_store, allowed_types, max_size)
+
+    tasks = [asyncio.ensure_future(bounded(file)) for file in files]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for task in tasks:
+            if not task.cancelled() and task.exception() is None and task.result().created:
+                await blob_store.discard(task.result().sha256, task.result().stored_name)
+        raise
+
+
+class UploadSizeLimit:
+    """ASGI middleware that caps multipart request bodies before Starlette spools them to disk.
+
+    MAX_UPLOAD_SIZE is only checked per file once the form has been parsed, by
+    which time the whole body has been received. This rejects a too-large
+    Content-Length up front and stops reading a body (chunked, or lying about
+    its length) as soon as it passes the limit. ``path_limits`` sets tighter
+    limits for single-file endpoints.
+    """
+
+    def __init__(self, app, max_size: int = MAX_MULTIPART_SIZE, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_size = max_size
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/"):
+            return await self.app(scope, receive, send)
+
+        limit = self.path_limits.get(scope["path"], self.max_size)
+        detail = f"Request body exceeds the {limit} byte upload limit"
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            return await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing; FastAPI passes HTTPExceptions through as they are.
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,80 @@
+"""
+Benchmarks attachment text search over a synthetic corpus of extracted PDF
+pages: a regex scan of the page text against the indexed terms lookup with
+ranking, company mapping and snippets.
+
+Usage:
+    python -m test.benchAttachmentSearch                          # in-memory stand-in
+    python -m test.benchAttachmentSearch --mongodb-url URL        # scratch database on a real server
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+
+from bson import ObjectId
+
+from repositories.AttachmentSearch import AttachmentSearch, index_pages
+from repositories.Indexes import ensure_indexes
+from repositories.MemoryDatabase import MemoryDatabase
+from test.benchCompanySearch import timed, vocabulary
+
+TERMS = ["revenue", "ebitda", "dividend", "audit", "liabilities", "equity", "cashflow", "impairment"]
+QUERIES = ["revenue", "audit impairment", "ebitda dividend equity", "zzz"]
+
+
+def synthetic_page(rng: random.Random, vocab: list) -> str:
+    words = rng.choices(vocab, k=300)
+    for _ in range(rng.randint(0, 3)):
+        words[rng.randrange(len(words))] = rng.choice(TERMS)
+    return " ".join(words)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongodb-url")
+    parser.add_argument("--database", default="bench_attachment_search")
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=30, help="pages per company attachment")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.mongodb_url:
+        from repositories.Database import create_client
+
+        client = create_client(args.mongodb_url)
+        await client.drop_database(args.database)
+        db = client[args.database]
+    else:
+        db = MemoryDatabase()
+    await ensure_indexes(db)
+
+    rng = random.Random(42)
+    vocab = vocabulary(rng)
+    for number in range(args.companies):
+        company_id = ObjectId()
+        sha256 = hashlib.sha256(str(number).encode()).hexdigest()
+        await db["companies"].insert_one({"_id": company_id, "name": f"Company {number}"})
+        await index_pages(db["attachment_pages"], sha256, [synthetic_page(rng, vocab) for _ in range(args.pages)])
+        await db["company_texts"].insert_one(
+            {"_id": company_id, "files": [{"stored_name": f"{sha256}_statement.pdf", "sha256": sha256}]}
+        )
+    search = AttachmentSearch(db["attachment_pages"], db["company_texts"], db["companies"])
+
+    print(f"{args.companies * args.pages} pages in {args.companies} attachments")
+    for query in QUERIES:
+        pattern = re.compile(r"\b" + r"\b.*\b".join(map(re.escape, query.split())) + r"\b")
+        scan_ms = await timed(lambda: db["attachment_pages"].find({"text": {"$regex": pattern}}, {"_id": 1}).to_list(None),
+                              args.repeat)
+        index_ms = await timed(lambda: search.search(query), args.repeat)
+        result = await search.search(query)
+        print(f"{query!r:26} scan {scan_ms:8.2f} ms   index {index_ms:8.2f} ms   "
+              f"({len(result['companies'])} of {result['total']} companies)")
+
+    if args.mongodb_url:
+        await client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Benchmarks serverless cold starts: each run is a fresh interpreter that imports
+the Mangum entry point (functions/index.py) and sends it API Gateway events,
+the way Netlify/Lambda does after a cold start.
+
+Reports import time, the first response (cold) and the next one (warm) for
+GET / and for an authenticated company list, with the serverless settings and
+with the long-lived server settings (startup maintenance run through Mangum's
+per-invocation lifespan).
+
+Usage:
+    python -m test.benchColdStart                           # in-memory stand-in
+    python -m test.benchColdStart --mongodb-url URL         # real server (DATABASE_NAME from the environment)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r'''
+import base64, json, os, sys, time, types
+start = time.perf_counter()
+if os.environ["BENCH_MODE"] == "server":
+    from main import app
+    from mangum import Mangum
+    handler = Mangum(app, lifespan="auto")
+else:
+    from functions.index import handler
+imported = time.perf_counter()
+
+def event(path, headers):
+    return {"resource": "/{proxy+}", "path": path, "httpMethod": "GET", "headers": headers,
+            "multiValueHeaders": {}, "queryStringParameters": None, "multiValueQueryStringParameters": None,
+            "requestContext": {"resourcePath": "/{proxy+}", "httpMethod": "GET", "path": path, "stage": "prod",
+                               "identity": {"sourceIp": "127.0.0.1"}},
+            "pathParameters": None, "stageVariables": None, "body": None, "isBase64Encoded": False}
+
+auth = {"authorization": "Basic " + base64.b64encode(b"admin:password").decode(), "host": "localhost"}
+timings = {"import": (imported - start) * 1000}
+for label, path, headers in [("root", "/", {"host": "localhost"}), ("companies", "/admin/companies", auth)]:
+    for attempt in ("cold", "warm"):
+        began = time.perf_counter()
+        response = handler(event(path, headers), types.SimpleNamespace())
+        timings[f"{label}_{attempt}"] = (time.perf_counter() - began) * 1000
+        assert response["statusCode"] == 200, response
+print(json.dumps(timings))
+'''
+
+
+def run(mode: str, environment: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", CHILD], env={**environment, "BENCH_MODE": mode},
+                            capture_output=True, text=True, check=True, cwd=os.getcwd())
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongodb-url")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    environment = {**os.environ, "ADMIN_USERNAME": "admin", "ADMIN_PASSWORD": "password", "AUTH_TOKEN_SECRET": "bench",
+                   "STORAGE_BACKEND": "memory"}
+    if args.mongodb_url:
+        environment.update(MONGODB_BACKEND="motor", MONGODB_URL=args.mongodb_url)
+    else:
+        environment.update(MONGODB_BACKEND="memory")
+
+    columns = ["import", "root_cold", "root_warm", "companies_cold", "companies_warm"]
+    print(f"median of {args.runs} fresh processes, ms")
+    print(f"{'mode':12}" + "".join(f"{column:>16}" for column in columns))
+    for mode, mode_environment in [("server", {"SERVERLESS": "false", "PDF_EXTRACT_WORKERS": "2"}), ("serverless", {})]:
+        results = [run(mode, {**environment, **mode_environment}) for _ in range(args.runs)]
+        print(f"{mode:12}" + "".join(f"{statistics.median(r[column] for r in results):16.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
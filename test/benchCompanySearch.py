@@ -0,0 +1,95 @@
+"""
+Benchmarks company search over a synthetic directory: the old unanchored
+case-insensitive regex on name against the indexed searchKeys lookup with
+relevance ranking.
+
+Usage:
+    python -m test.benchCompanySearch                          # in-memory stand-in
+    python -m test.benchCompanySearch --mongodb-url URL        # scratch database on a real server
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+
+from repositories.CompanyRepository import CompanyRepository
+from repositories.CompanySearch import search_keys, search_query
+from repositories.Indexes import ensure_indexes
+from repositories.MemoryDatabase import MemoryDatabase
+
+WORDS = ["alpha", "nile", "delta", "smart", "green", "capital", "logistics", "health", "tech", "energy",
+         "foods", "systems", "bridge", "pyramid", "oasis", "falcon", "atlas", "horizon", "cloud", "solar"]
+CATEGORIES = ["Technology", "Healthcare", "Energy", "Retail", "Finance", "Logistics", "Agriculture"]
+LOCATIONS = ["Cairo", "Alexandria", "Giza", "Dubai", "Riyadh", "London", "Berlin"]
+QUERIES = ["nile", "smart hea", "falcon cairo", "solar energy", "zzz"]
+SYLLABLES = ["ka", "ro", "mi", "ten", "sa", "lu", "dor", "ve", "ni", "pa", "zu", "qor", "el", "ba", "ti"]
+
+
+def vocabulary(rng: random.Random, size: int = 20_000) -> list:
+    return ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size)]
+
+
+def synthetic_company(rng: random.Random, vocab: list) -> dict:
+    company = {
+        "name": " ".join(rng.sample(WORDS, 2)).title() + " " + rng.choice(vocab).title(),
+        "category": rng.choice(CATEGORIES),
+        "size": rng.choice(["small", "medium", "large"]),
+        "location": rng.choice(LOCATIONS),
+        "description": " ".join(rng.choices(vocab, k=40)),
+        "mission": " ".join(rng.choices(vocab, k=12)),
+    }
+    company["searchKeys"] = search_keys(company)
+    return company
+
+
+async def timed(coroutine_factory, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await coroutine_factory()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongodb-url")
+    parser.add_argument("--database", default="bench_company_search")
+    parser.add_argument("--companies", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.mongodb_url:
+        from repositories.Database import create_client
+
+        client = create_client(args.mongodb_url)
+        await client.drop_database(args.database)
+        db = client[args.database]
+    else:
+        db = MemoryDatabase()
+    collection = db["companies"]
+
+    rng = random.Random(42)
+    vocab = vocabulary(rng)
+    for start in range(0, args.companies, 5000):
+        batch = [synthetic_company(rng, vocab) for _ in range(min(5000, args.companies - start))]
+        await collection.insert_many(batch)
+    await ensure_indexes(db)
+    repository = CompanyRepository(collection)
+
+    print(f"{args.companies} companies")
+    for search in QUERIES:
+        regex_query = {"name": {"$regex": re.escape(search), "$options": "i"}}
+        regex_ms = await timed(lambda: asyncio.gather(repository.count(regex_query),
+                                                      repository.find_page(regex_query, 0, 100)), args.repeat)
+        index_query = search_query(search)
+        index_ms = await timed(lambda: asyncio.gather(repository.count(index_query),
+                                                      repository.search_page(index_query, search, 0, 100)), args.repeat)
+        hits = await repository.count(index_query)
+        print(f"{search!r:16} regex {regex_ms:8.2f} ms   index {index_ms:8.2f} ms   ({hits} indexed hits)")
+
+    if args.mongodb_url:
+        await client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Compares concurrent-request throughput of a company list handler that calls a
+blocking driver (the old pymongo path) with one that awaits the async
+repository.
+
+Usage:
+    python -m test.benchConcurrency                      # simulated 20 ms round trips
+    python -m test.benchConcurrency --mongodb-url URL    # real pymongo vs Motor
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from repositories.CompanyRepository import CompanyRepository
+from repositories.MemoryDatabase import MemoryDatabase
+
+
+class BlockingCollection:
+    """Simulates a synchronous driver: every call holds the event loop for ``latency``."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def find(self, query):
+        time.sleep(self.latency)
+        return []
+
+
+def build_app(blocking_collection, repository: CompanyRepository) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/before")
+    async def before():
+        return list(blocking_collection.find({}))
+
+    @app.get("/after")
+    async def after():
+        return await repository.find_page({}, 0, 100)
+
+    return app
+
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongodb-url")
+    parser.add_argument("--database", default="bench")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.mongodb_url:
+        from pymongo import MongoClient
+        from repositories.Database import create_client
+
+        blocking_collection = MongoClient(args.mongodb_url)[args.database]["companies"]
+        repository = CompanyRepository(create_client(args.mongodb_url)[args.database]["companies"])
+    else:
+        blocking_collection = BlockingCollection(args.latency)
+        repository = CompanyRepository(MemoryDatabase(latency=args.latency)["companies"])
+
+    app = build_app(blocking_collection, repository)
+    for path in ("/before", "/after"):
+        throughput = await run(app, path, args.requests, args.concurrency)
+        print(f"{path:8} {throughput:8.1f} req/s  ({args.requests} requests, concurrency {args.concurrency})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Event-loop stalls while hashing passwords inline vs in the bcrypt pool, and
+the cost of a cached verification.
+
+Usage:
+    BCRYPT_ROUNDS=12 python -m test.benchPasswords
+"""
+import asyncio
+import time
+
+from services.Passwords import BCRYPT_ROUNDS, hash_password, password_context, verify_password
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def measure(name: str, hashes):
+    stop, lags = asyncio.Event(), []
+    task = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await hashes()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await task
+    print(f"{name:8} 8 hashes in {elapsed * 1000:7.1f} ms, worst loop stall {max(lags) * 1000:7.1f} ms")
+
+
+async def main():
+    print(f"bcrypt rounds: {BCRYPT_ROUNDS}")
+
+    async def inline():
+        for _ in range(8):
+            password_context().hash("secret")
+            await asyncio.sleep(0)
+
+    async def pooled():
+        await asyncio.gather(*(hash_password("secret") for _ in range(8)))
+
+    await measure("inline", inline)
+    await measure("pool", pooled)
+
+    hashed = await hash_password("secret")
+    start = time.perf_counter()
+    await verify_password("secret", hashed)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(1000):
+        await verify_password("secret", hashed)
+    cached = (time.perf_counter() - start) / 1000
+    print(f"verify   first {first * 1000:.1f} ms, cached {cached * 1_000_000:.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
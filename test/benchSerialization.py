@@ -0,0 +1,63 @@
+"""
+Per-company cost of encoding a list_companies page: the old path
+(CompanyResponse + jsonable_encoder + JSONResponse), strict TypeAdapter
+validation, and the trusted direct-to-JSON path.
+
+Usage:
+    MONGODB_BACKEND=memory AUTH_EPHEMERAL_SECRET=true python -m test.benchSerialization
+"""
+import time
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from main import CompanyResponse
+from services.Serialization import dump_documents, dump_validated
+
+
+def synthetic_company(index: int) -> dict:
+    items = [{"key": f"Item {i}", "value": f"Value {i}", "fileName": f"/files/{i}.pdf", "action": None, "link": None}
+             for i in range(5)]
+    return {
+        "_id": ObjectId(),
+        "name": f"Company {index}", "category": "Technology", "size": "medium", "location": "Cairo",
+        "description": "An example company " * 10, "logo": "/files/no-logo.png", "website": "https://example.com",
+        "revenue": 1_000_000 + index, "founded": "2001", "headquarters": "Cairo", "mission": "Build things",
+        "company_values": ["Integrity", "Quality", "Speed"],
+        "investors": items, "financialStatement": items, "assessment": items, "portfolio": items,
+        "dynamicSections": [{"key": "Extra", "value": items}],
+    }
+
+
+def prepare(documents):
+    return [{"id": str(document["_id"]), **{k: v for k, v in document.items() if k != "_id"}} for document in documents]
+
+
+def old_path(documents):
+    companies = [CompanyResponse(**company) for company in prepare(documents)]
+    return JSONResponse(content=jsonable_encoder(companies)).body
+
+
+def strict_path(documents):
+    return dump_validated(CompanyResponse, prepare(documents))
+
+
+def trusted_path(documents):
+    return dump_documents(prepare(documents))
+
+
+def main():
+    for page_size in (100, 1000):
+        documents = [synthetic_company(i) for i in range(page_size)]
+        repeat = max(1, 20_000 // page_size)
+        for name, encode in (("old", old_path), ("strict", strict_path), ("trusted", trusted_path)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                encode(documents)
+            per_company = (time.perf_counter() - start) / repeat / page_size * 1_000_000
+            print(f"{page_size:5} per page  {name:8} {per_company:8.2f} us/company")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+main's app on the in-memory database and storage stand-ins, for the endpoint tests.
+
+Storage and database backends are chosen from the environment when their
+modules are first imported (after .env is loaded), so setting the variables in
+a test could be too late and it would write into the real uploads/. Instead
+the objects main builds from them are rebuilt on the stand-ins and patched in.
+"""
+import os
+from unittest import mock
+
+os.environ.update(ADMIN_USERNAME="admin", ADMIN_PASSWORD="password", AUTH_TOKEN_SECRET="test-secret")
+
+from fastapi.testclient import TestClient
+
+import main
+import routes.UserRoutes
+from repositories.AttachmentSearch import AttachmentSearch
+from repositories.CompanyRepository import CompanyRepository
+from repositories.Database import get_database
+from repositories.UserRepository import UserRepository
+from services.BlobStore import BlobStore
+from services.Storage import get_storage
+from services.TextExtraction import TextExtractor
+from services.Thumbnails import ThumbnailCache
+
+AUTH = ("admin", "password")
+
+
+def memory_backends() -> dict:
+    db = get_database(backend="memory")
+    storage = get_storage("memory")
+    return {
+        "db": db, "companies_collection": db["companies"], "users_collection": db["users"], "storage": storage,
+        "blob_store": BlobStore(db["blobs"], storage), "thumbnails": ThumbnailCache(storage),
+        "text_extractor": TextExtractor(db, storage, workers=0),
+        "attachment_search": AttachmentSearch(db["attachment_pages"], db["company_texts"], db["companies"],
+                                              main.ATTACHMENT_SEARCH_MAX_CANDIDATES),
+        "user_repository": UserRepository(db["users"]),
+        "company_repository": CompanyRepository(db["companies"], main.COMPANY_COUNT_STRATEGY,
+                                                main.COMPANY_COUNT_CACHE_TTL, main.COMPANY_SEARCH_MAX_CANDIDATES),
+    }
+
+
+def start_memory_app(test_class: type) -> TestClient:
+    """Patches the stand-ins into main for the class's tests and returns a started client."""
+    backends = memory_backends()
+    for patcher in (mock.patch.multiple(main, **backends),
+                    mock.patch.object(routes.UserRoutes, "user_repository", backends["user_repository"])):
+        patcher.start()
+        test_class.addClassCleanup(patcher.stop)
+    client = TestClient(main.app).__enter__()
+    test_class.addClassCleanup(client.__exit__, None, None, None)
+    return client
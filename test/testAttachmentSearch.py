@@ -0,0 +1,82 @@
+"""
+Attachment text search end to end: upload a PDF, link it from a company and
+find the company by words on its pages.
+
+Usage:
+    python -m unittest test.testAttachmentSearch
+"""
+import json
+import os
+import unittest
+
+from repositories.AttachmentSearch import AttachmentSearch, index_pages
+from repositories.Database import get_database
+from services.TextExtraction import legacy_pdf_references
+from test.memoryApp import AUTH, main, start_memory_app
+
+EXAMPLE_PDF = os.path.join(os.path.dirname(__file__), "example.pdf")
+
+
+def company_form(name: str, statement_url: str) -> dict:
+    empty = json.dumps([])
+    return {
+        "name": name, "category": "Health", "size": "10", "location": "Berlin", "description": "d",
+        "website": "https://example.com", "revenue": "1", "founded": "2020", "headquarters": "Berlin",
+        "mission": "m", "company_values": empty, "investors": empty, "assessment": empty, "portfolio": empty,
+        "dynamicSections": empty, "financialStatement": json.dumps([{"year": "2024", "file": statement_url}]),
+    }
+
+
+class AttachmentSearchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = start_memory_app(cls)
+
+    def upload(self, filename: str) -> str:
+        with open(EXAMPLE_PDF, "rb") as file:
+            response = self.client.post("/admin/upload/", files={"file": (filename, file, "application/pdf")})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["file_url"]
+
+    def test_filename_with_spaces(self):
+        file_url = self.upload("Annual Report.pdf")
+        response = self.client.post("/admin/companies/add", data=company_form("Spaced Files", file_url), auth=AUTH)
+        self.assertEqual(response.status_code, 200)
+
+        texts = self.client.portal.call(main.db["company_texts"].find_one, {})
+        self.assertEqual([file["stored_name"] for file in texts["files"]], [file_url.rsplit("/files/", 1)[1]])
+
+        result = self.client.get("/admin/attachments/search", params={"q": "blood test"}, auth=AUTH).json()
+        self.assertEqual([company["name"] for company in result["companies"]], ["Spaced Files"])
+        self.assertTrue(result["companies"][0]["hits"][0]["file_url"].endswith("_Annual Report.pdf"))
+
+    def test_every_match_reachable_past_the_page_cap(self):
+        db = get_database(backend="memory")
+        search = AttachmentSearch(db["attachment_pages"], db["company_texts"], db["companies"], max_candidates=2)
+
+        async def seed():
+            for number in range(5):
+                sha256 = f"{number:064x}"
+                await index_pages(db["attachment_pages"], sha256, ["annual revenue grew"] * (number + 1))
+                await db["company_texts"].insert_one(
+                    {"_id": number, "files": [{"stored_name": f"{sha256}_report.pdf", "sha256": sha256}]}
+                )
+                await db["companies"].insert_one({"_id": number, "name": f"Company {number}"})
+
+        self.client.portal.call(seed)
+        first = self.client.portal.call(search.search, "revenue", 3)
+        rest = self.client.portal.call(search.search, "revenue", 3, 3, 3)
+        self.assertEqual(first["total"], 5)
+        self.assertEqual([company["name"] for company in first["companies"] + rest["companies"]],
+                         [f"Company {number}" for number in range(4, -1, -1)])
+        self.assertEqual([company["page_hits"] for company in first["companies"]], [5, 4, 3])
+        self.assertEqual(len(first["companies"][0]["hits"]), 2)
+
+    def test_legacy_names_with_spaces(self):
+        document = {"a": "/files/Annual Report 2023.pdf", "b": '<a href="/files/Q1 Notes.PDF?v=2">notes</a>',
+                    "c": "/files/" + "0" * 64 + "_Hashed One.pdf", "d": "/files/logo.png"}
+        self.assertEqual(legacy_pdf_references(document), {"Annual Report 2023.pdf", "Q1 Notes.PDF"})
+
+
+if __name__ == "__main__":
+    unittest.main()
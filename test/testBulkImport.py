@@ -0,0 +1,119 @@
+"""
+Incremental parsing of bulk import bodies: every input is fed in every chunk
+size, so values, escapes and UTF-8 sequences split across chunks are covered.
+Also the per-row results of POST /admin/companies/bulk when the body breaks
+part way through.
+
+Usage:
+    python -m unittest test.testBulkImport
+"""
+import json
+import unittest
+from typing import AsyncIterator, List
+from unittest import mock
+
+from services.BulkImport import array_records, ndjson_records
+from test.memoryApp import AUTH, main, start_memory_app
+
+
+async def chunked(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(parser, data: bytes, size: int, **options) -> List[tuple]:
+    return [record async for record in parser(chunked(data, size), **options)]
+
+
+class ArrayRecordsTest(unittest.IsolatedAsyncioTestCase):
+    async def assertRecords(self, text: str, expected: List[tuple], **options):
+        data = text.encode()
+        for size in range(1, len(data) + 1):
+            with self.subTest(chunk_size=size):
+                self.assertEqual(await collect(array_records, data, size, **options), expected)
+
+    async def test_numbers_split_across_chunks(self):
+        await self.assertRecords("[123456, -7.25,1e3 ,0]", [(123456, None), (-7.25, None), (1000.0, None), (0, None)])
+
+    async def test_strings_escapes_and_utf8(self):
+        values = ['a"b', "back\\slash", "été €", "\U0001f600", {"name": "Café", "tags": ["x]", "y,"]}]
+        await self.assertRecords(json.dumps(values, ensure_ascii=False), [(value, None) for value in values])
+        await self.assertRecords(json.dumps(values), [(value, None) for value in values])
+
+    async def test_literals_and_empty_array(self):
+        await self.assertRecords("[true, false, null]", [(True, None), (False, None), (None, None)])
+        await self.assertRecords(" [ ] ", [])
+
+    async def test_oversize_record_ends_the_stream(self):
+        text = '[{"a": 1}, {"b": "' + "x" * 50 + '"}, {"c": 3}]'
+        await self.assertRecords(text, [({"a": 1}, None), (None, "Record exceeds 20 characters")], max_record_size=20)
+
+    async def test_trailing_malformed_element(self):
+        records = await collect(array_records, b'[{"a": 1}, {"b": ]', 3)
+        self.assertEqual(records[0], ({"a": 1}, None))
+        self.assertEqual(len(records), 2)
+        self.assertTrue(records[1][1].startswith("Invalid JSON"))
+
+    async def test_truncated_body(self):
+        records = await collect(array_records, b'[{"a": 1}, {"b": 2}', 4)
+        self.assertEqual(records[:2], [({"a": 1}, None), ({"b": 2}, None)])
+        self.assertIsNotNone(records[-1][1])
+
+    async def test_missing_separator_and_not_an_array(self):
+        self.assertEqual(await collect(array_records, b"[1 2]", 1),
+                         [(1, None), (None, "Expected ',' or ']' between array elements")])
+        self.assertEqual(await collect(array_records, b'{"a": 1}', 2), [(None, "Expected a JSON array")])
+
+
+class NdjsonRecordsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_bad_and_oversize_lines_are_skipped(self):
+        text = '{"a": 1}\nnot json\n{"long": "' + "x" * 50 + '"}\n\n{"b": "é"}'
+        data = text.encode()
+        for size in range(1, len(data) + 1):
+            with self.subTest(chunk_size=size):
+                records = await collect(ndjson_records, data, size, max_record_size=30)
+                self.assertEqual([record for record, _ in records], [{"a": 1}, None, None, {"b": "é"}])
+                self.assertTrue(records[1][1].startswith("Invalid JSON"))
+                self.assertEqual(records[2][1], "Record exceeds 30 characters")
+
+
+def company(name: str) -> dict:
+    return {
+        "name": name, "category": "Health", "size": "10", "location": "Berlin", "description": "d",
+        "website": "https://example.com", "revenue": 1, "founded": "2020", "headquarters": "Berlin", "mission": "m",
+        "company_values": [], "investors": [], "financialStatement": [], "assessment": [], "portfolio": [],
+        "dynamicSections": [],
+    }
+
+
+class BulkCreateTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = start_memory_app(cls)
+
+    def test_failed_write_reports_every_row_read(self):
+        body = b"".join(json.dumps(company(f"Bulk {number}")).encode() + b"\n" for number in range(5))
+        insert_many = main.company_repository.insert_many
+
+        async def fail_after_first_batch(documents):
+            if fail_after_first_batch.calls:
+                raise RuntimeError("connection reset")
+            fail_after_first_batch.calls += 1
+            return await insert_many(documents)
+
+        fail_after_first_batch.calls = 0
+        with mock.patch.object(main, "BULK_INSERT_BATCH_SIZE", 2), \
+                mock.patch.object(main.company_repository, "insert_many", fail_after_first_batch):
+            response = self.client.post("/admin/companies/bulk", content=body, auth=AUTH,
+                                        headers={"Content-Type": "application/x-ndjson"})
+        self.assertEqual(response.status_code, 500)
+        result = response.json()
+        self.assertEqual(result["error"], "Import stopped: connection reset")
+        self.assertEqual((result["inserted"], result["failed"]), (2, 3))
+        self.assertEqual([row["index"] for row in result["results"]], [0, 1, 2, 3, 4])
+        self.assertTrue(all("id" in row for row in result["results"][:2]))
+        # Rows 2-3 were in the failed batch, row 4 was read but never sent.
+        self.assertTrue(all(row["error"].startswith("Not imported") for row in result["results"][2:]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+S3Storage against moto's in-process S3 stand-in (the same API MinIO and R2
+speak): put, reads, ranged downloads through the /files redirect, delete and
+missing keys.
+
+Usage:
+    pip install boto3 moto
+    python -m unittest test.testS3Storage
+"""
+import os
+import tempfile
+import unittest
+from urllib.parse import quote
+
+try:
+    import boto3
+    import requests
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+from services.Storage import S3Storage
+
+BUCKET = "company-files"
+NAME = "0" * 64 + "_Annual Report.pdf"
+DATA = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+
+@unittest.skipIf(mock_aws is None, "needs boto3, requests and moto")
+class S3StorageTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        os.environ.update(AWS_ACCESS_KEY_ID="test", AWS_SECRET_ACCESS_KEY="test", AWS_DEFAULT_REGION="us-east-1")
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        self.storage = S3Storage(BUCKET, client=client)
+
+    async def put(self, name: str = NAME, data: bytes = DATA) -> str:
+        descriptor, path = tempfile.mkstemp()
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        await self.storage.put_file(path, name, "application/pdf")
+        return path
+
+    async def test_put_and_read(self):
+        path = await self.put()
+        self.assertFalse(os.path.exists(path), "the incoming temp file is removed after upload")
+        self.assertTrue(await self.storage.exists(NAME))
+        self.assertEqual(await self.storage.read(NAME), DATA)
+        self.assertEqual(await self.storage.list_names(), [NAME])
+
+        head = self.storage.client.head_object(Bucket=BUCKET, Key=NAME)
+        self.assertEqual(head["ContentType"], "application/pdf")
+        self.assertIn("immutable", head["CacheControl"])
+
+    async def test_ranged_download_through_redirect(self):
+        await self.put()
+        response = await self.storage.response(NAME)
+        self.assertEqual(response.status_code, 307)
+
+        download = requests.get(response.headers["location"], headers={"Range": "bytes=9-24"})
+        self.assertEqual(download.status_code, 206)
+        self.assertEqual(download.content, DATA[9:25])
+        self.assertEqual(download.headers["Content-Range"], f"bytes 9-24/{len(DATA)}")
+
+    async def test_public_url_redirect(self):
+        storage = S3Storage(BUCKET, public_url="https://cdn.example.com/", client=self.storage.client)
+        response = await storage.response(NAME)
+        self.assertEqual(response.headers["location"], f"https://cdn.example.com/{quote(NAME)}")
+        self.assertEqual((await storage.response("../secrets")).status_code, 404)
+
+    async def test_delete(self):
+        await self.put()
+        await self.storage.delete(NAME)
+        self.assertFalse(await self.storage.exists(NAME))
+        self.assertIsNone(await self.storage.read(NAME))
+        self.assertEqual(await self.storage.list_names(), [])
+
+    async def test_missing_key(self):
+        self.assertFalse(await self.storage.exists("missing.pdf"))
+        self.assertIsNone(await self.storage.read("missing.pdf"))
+        self.assertIsNone(self.storage.local_path("missing.pdf"))
+        await self.storage.delete("missing.pdf")  # S3 deletes are idempotent
+
+
+if __name__ == "__main__":
+    unittest.main()